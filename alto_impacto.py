@@ -5,6 +5,7 @@ de mayor interés.
 
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 from statsmodels.tsa.seasonal import STL
 
@@ -34,6 +35,11 @@ MES = "noviembre"
 # El mes que se mostrará en la anotación de la fuente.
 MES_FUENTE = "diciembre"
 
+# Nuestra gráfica no usa fórmulas, así que no necesitamos
+# que kaleido cargue MathJax al iniciar.
+if pio.kaleido.scope is not None:
+    pio.kaleido.scope.mathjax = None
+
 
 def main():
     # Estas abreviaciones serán usadas para el eje horizontal.
@@ -53,14 +59,22 @@ def main():
     }
 
     # Cargamos el dataset de series de tiempo estatal y definimos la columna índice.
+    # Las entidades y los delitos se leen como categorías.
     df = pd.read_csv(
-        "./data/timeseries_estatal.csv", parse_dates=["isodate"], index_col="isodate"
+        "./data/timeseries_estatal.csv",
+        parse_dates=["isodate"],
+        index_col="isodate",
+        dtype={"entidad": "category", "delito": "category"},
     )
 
     # Filtramos el DataFrame hasta el mes actual y a nivel nacional.
     df = df[df.index <= MES_ACTUAL]
     df = df[df["entidad"] == "Nacional"]
 
+    # Indexamos por delito y fecha, y ordenamos el índice una sola vez.
+    # Así cada delito se selecciona con .loc sin recorrer todo el DataFrame.
+    df = df.set_index("delito", append=True).swaplevel().sort_index()
+
     totales = list()
     colores = list()
 
@@ -83,17 +97,24 @@ def main():
     for fila in range(4):
         for columna in range(3):
             # Filtramos el dataset con el delito seleccionado.
-            temp_df = df[df["delito"] == DELITOS[index]].copy()
+            temp_df = df.loc[DELITOS[index]].copy()
 
             # Escogemos los últimos 13 meses del delito seleccionado.
             temp_df = temp_df[-13:]
 
             # Calculamos la tendencia usando STL.
-            temp_df["tendencia"] = STL(temp_df["total"]).fit().trend
+            # Le pasamos el arreglo de NumPy con el periodo mensual ya definido,
+            # así STL no tiene que inferir la frecuencia del índice de fechas.
+            temp_df["tendencia"] = (
+                STL(temp_df["total"].to_numpy(), period=12).fit().trend
+            )
 
             # Creamos la columna de fecha usando la abreviación y el año en formato corto.
-            temp_df["fecha"] = temp_df.index.map(
-                lambda x: f"{abreviaciones[x.month]}<br>'{x.year-2000}"
+            # Armamos todas las etiquetas a la vez a partir del mes y el año.
+            temp_df["fecha"] = (
+                temp_df.index.month.map(abreviaciones)
+                + "<br>'"
+                + (temp_df.index.year - 2000).astype(str)
             )
 
             # Para nuestra gráfica sparkline solo el primer y el último punto
@@ -7,9 +7,12 @@ main2() : Coloca en una tabla la comparación anual de los subtipos de delito
 main2() genera una tabla mucho más grande verticalmente
 """
 
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 
 
 # El primer año que se desea comparar
@@ -27,26 +30,55 @@ ENTIDAD = "México"
 # Fecha para mostrar en la fuente.
 FUENTE_FECHA = "(agosto 2023)"
 
+# Ambas tablas se exportan con el mismo proceso de kaleido
+# y ninguna usa fórmulas, así que no necesitamos que cargue MathJax
+if pio.kaleido.scope is not None:
+    pio.kaleido.scope.mathjax = None
+
+
+@lru_cache(maxsize=None)
+def cargar_datos():
+    """
+    Carga el dataset de delitos estatales.
+    Ambas funciones usan el mismo dataset, así que lo cargamos una sola vez.
+    El DataFrame es compartido, por lo que no debe ser modificado.
+    Solo leemos las columnas que usamos y las de texto como categorías.
+    """
+
+    return pd.read_csv(
+        "./data/estatal.csv",
+        encoding="latin-1",
+        usecols=["Año", "Entidad", "Tipo de delito", "Subtipo de delito", MES],
+        dtype={
+            "Año": "int16",
+            "Entidad": "category",
+            "Tipo de delito": "category",
+            "Subtipo de delito": "category",
+        },
+    )
+
 
 def main():
     # Cargamos el dataset de delitos esttales.
-    df = pd.read_csv("./data/estatal.csv", encoding="latin-1")
+    df = cargar_datos()
 
     # Si la entidad es México entonces se calcula a nivel nacional
     # de lo contrario se calcula a nivel estatal
     if ENTIDAD != "México":
         df = df[df["Entidad"] == ENTIDAD]
 
-    # Creamos un DataFrame para el primer año
-    df1 = df[df["Año"] == AÑO1].groupby("Tipo de delito").sum()
-    df1 = df1[MES].to_frame(AÑO1)
-
-    # Creamos un DataFrame para el segundo año
-    df2 = df[df["Año"] == AÑO2].groupby("Tipo de delito").sum()
-    df2 = df2[MES].to_frame(AÑO2)
+    # Sumamos el mes de ambos años en una sola agrupación,
+    # donde cada año queda como una columna
+    final = (
+        df[df["Año"].isin([AÑO1, AÑO2])]
+        .groupby(["Tipo de delito", "Año"], observed=True)[MES]
+        .sum()
+        .unstack("Año")
+    )
 
-    # Combinamos los DataFrames
-    final = pd.concat([df1, df2], axis=1)
+    # Los delitos los regresamos a texto, ya que
+    # el resultado recibirá una nueva fila
+    final.index = final.index.astype(str)
 
     # Agregamos una fila con el conteeo total
     final.loc["Todos los delitos"] = final.sum(axis=0)
@@ -60,11 +92,11 @@ def main():
 
     # Preparamos las celdas para su presentación
     # Nota: la parte de <sup> es un hack para alinear el texto verticalmente
-    final["nombre"] = final.index.map(lambda x: "{}<sup></sup>".format(x))
-    final["texto"] = final.apply(format_text, axis=1)
-    final[AÑO1] = final[AÑO1].apply(lambda x: "{:,.0f}<sup></sup>".format(x))
-    final[AÑO2] = final[AÑO2].apply(lambda x: "{:,.0f}<sup></sup>".format(x))
-    final["color"] = final["diff"].apply(set_color)
+    final["nombre"] = final.index.map("{}<sup></sup>".format)
+    final["texto"] = format_text(final)
+    final[AÑO1] = final[AÑO1].map("{:,.0f}<sup></sup>".format)
+    final[AÑO2] = final[AÑO2].map("{:,.0f}<sup></sup>".format)
+    final["color"] = set_color(final["diff"])
 
     fig = go.Figure()
 
@@ -133,23 +165,25 @@ def main():
 
 def main2():
     # Cargamos el dataset de delitos esttales.
-    df = pd.read_csv("./data/estatal.csv", encoding="latin-1")
+    df = cargar_datos()
 
     # Si la entidad es México entonces se calcula a nivel nacional
     # de lo contrario se calcula a nivel estatal
     if ENTIDAD != "México":
         df = df[df["Entidad"] == ENTIDAD]
 
-    # Creamos un DataFrame para el primer año
-    df1 = df[df["Año"] == AÑO1].groupby("Subtipo de delito").sum()
-    df1 = df1[MES].to_frame(AÑO1)
-
-    # Creamos un DataFrame para el segundo año
-    df2 = df[df["Año"] == AÑO2].groupby("Subtipo de delito").sum()
-    df2 = df2[MES].to_frame(AÑO2)
+    # Sumamos el mes de ambos años en una sola agrupación,
+    # donde cada año queda como una columna
+    final = (
+        df[df["Año"].isin([AÑO1, AÑO2])]
+        .groupby(["Subtipo de delito", "Año"], observed=True)[MES]
+        .sum()
+        .unstack("Año")
+    )
 
-    # Combinamos los DataFrames
-    final = pd.concat([df1, df2], axis=1)
+    # Los delitos los regresamos a texto, ya que
+    # el resultado recibirá una nueva fila
+    final.index = final.index.astype(str)
 
     # Agregamos una fila con el conteeo total
     final.loc["Todos los delitos"] = final.sum(axis=0)
@@ -163,11 +197,11 @@ def main2():
 
     # Preparamos las celdas para su presentación
     # Nota: la parte de <sup> es un hack para alinear el texto verticalmente
-    final["nombre"] = final.index.map(lambda x: "{}<sup></sup>".format(x))
-    final["texto"] = final.apply(format_text, axis=1)
-    final[AÑO1] = final[AÑO1].apply(lambda x: "{:,.0f}<sup></sup>".format(x))
-    final[AÑO2] = final[AÑO2].apply(lambda x: "{:,.0f}<sup></sup>".format(x))
-    final["color"] = final["diff"].apply(set_color)
+    final["nombre"] = final.index.map("{}<sup></sup>".format)
+    final["texto"] = format_text(final)
+    final[AÑO1] = final[AÑO1].map("{:,.0f}<sup></sup>".format)
+    final[AÑO2] = final[AÑO2].map("{:,.0f}<sup></sup>".format)
+    final["color"] = set_color(final["diff"])
 
     fig = go.Figure()
 
@@ -231,27 +265,23 @@ def main2():
     fig.write_image("./comparacion_subtipo_delitos.png")
 
 
-def format_text(x):
+def format_text(df):
     """
     El cambio porcentual puede venir en diferentes formas
     Aquí las detectamos y formateamos el texto de acorde
+    Todas las filas se formatean a la vez
     """
 
-    # En caso de que el cambio porcentual sea infinito
-    if x["change"] == np.inf:
-        return "+{:,.0f} <sup>---</sup>".format(x["diff"])
+    # El cambio porcentual es infinito o nulo cuando el primer año es cero
+    sin_cambio = (df["change"] == np.inf) | df["change"].isna()
 
-    # En caso de que el cambio porcentual se nulo
-    if pd.isna(x["change"]):
-        if x["diff"] == 0.0:
-            return "{:,.0f} <sup>---</sup>".format(x["diff"])
-        else:
-            return "+{:,.0f} <sup>---</sup>".format(x["diff"])
+    # Los aumentos llevan el signo +, al igual que las diferencias
+    # distintas de cero cuyo cambio porcentual no se puede calcular
+    signo = np.where((df["diff"] > 0) | (sin_cambio & (df["diff"] != 0)), "+", "")
 
-    if x["diff"] > 0:
-        return "+{:,.0f} <sup>+{:,.2f}%</sup>".format(x["diff"], x["change"])
-    else:
-        return "{:,.0f} <sup>{:,.2f}%</sup>".format(x["diff"], x["change"])
+    cambio = (signo + df["change"].map("{:,.2f}%".format)).where(~sin_cambio, "---")
+
+    return signo + df["diff"].map("{:,.0f}".format) + " <sup>" + cambio + "</sup>"
 
 
 def set_color(x):
@@ -259,15 +289,17 @@ def set_color(x):
     Con esta función definimos que color de fondo tendrá la celda del cambio porcentual
     """
 
-    # Rojo para los delitos que aumentaron
-    if x > 0:
-        return "#8B0000"
-    # Verde para los delitos que se redujeron
-    elif x < 0:
-        return "#1b5e20"
-    # Azul para los que se mantuvieron igual
-    else:
-        return "#084177"
+    return np.select(
+        [x > 0, x < 0],
+        [
+            # Rojo para los delitos que aumentaron
+            "#8B0000",
+            # Verde para los delitos que se redujeron
+            "#1b5e20",
+        ],
+        # Azul para los que se mantuvieron igual
+        "#084177",
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""
+Constantes compartidas por los scripts de este repositorio.
+
+Los diccionarios están envueltos en MappingProxyType y las tablas
+de consulta son de solo lectura, así que ningún script puede
+modificar los valores que usan los demás.
+
+Fuente de abreviaciones:
+
+https://www.ieec.org.mx/transparencia/doctos/art74/i/reglamentos/Reglamento_de_elecciones/anexo_7.pdf
+
+"""
+
+from types import MappingProxyType
+
+import numpy as np
+
+
+ENTIDADES = MappingProxyType(
+    {
+        1: "Aguascalientes",
+        2: "Baja California",
+        3: "Baja California Sur",
+        4: "Campeche",
+        5: "Coahuila",
+        6: "Colima",
+        7: "Chiapas",
+        8: "Chihuahua",
+        9: "Ciudad de México",
+        10: "Durango",
+        11: "Guanajuato",
+        12: "Guerrero",
+        13: "Hidalgo",
+        14: "Jalisco",
+        15: "Estado de México",
+        16: "Michoacán",
+        17: "Morelos",
+        18: "Nayarit",
+        19: "Nuevo León",
+        20: "Oaxaca",
+        21: "Puebla",
+        22: "Querétaro",
+        23: "Quintana Roo",
+        24: "San Luis Potosí",
+        25: "Sinaloa",
+        26: "Sonora",
+        27: "Tabasco",
+        28: "Tamaulipas",
+        29: "Tlaxcala",
+        30: "Veracruz",
+        31: "Yucatán",
+        32: "Zacatecas",
+    }
+)
+
+
+ABREVIACIONES = MappingProxyType(
+    {
+        "Aguascalientes": "AGS",
+        "Baja California": "BC",
+        "Baja California Sur": "BCS",
+        "Campeche": "CAMP",
+        "Coahuila": "COAH",
+        "Colima": "COL",
+        "Chiapas": "CHIS",
+        "Chihuahua": "CHIH",
+        "Ciudad de México": "CDMX",
+        "Durango": "DGO",
+        "Guanajuato": "GTO",
+        "Guerrero": "GRO",
+        "Hidalgo": "HGO",
+        "Jalisco": "JAL",
+        "Estado de México": "MEX",
+        "Michoacán": "MICH",
+        "Morelos": "MOR",
+        "Nayarit": "NAY",
+        "Nuevo León": "NL",
+        "Oaxaca": "OAX",
+        "Puebla": "PUE",
+        "Querétaro": "QRO",
+        "Quintana Roo": "QROO",
+        "San Luis Potosí": "SLP",
+        "Sinaloa": "SIN",
+        "Sonora": "SON",
+        "Tabasco": "TAB",
+        "Tamaulipas": "TAMPS",
+        "Tlaxcala": "TLAX",
+        "Veracruz": "VER",
+        "Yucatán": "YUC",
+        "Zacatecas": "ZAC",
+    }
+)
+
+
+COLORES = MappingProxyType(
+    {
+        "Aguascalientes": "#f44336",
+        "Baja California": "#d50000",
+        "Baja California Sur": "#455a64",
+        "Campeche": "#e91e63",
+        "Coahuila": "#c51162",
+        "Colima": "#880e4f",
+        "Chiapas": "#9c27b0",
+        "Chihuahua": "#4a148c",
+        "Ciudad de México": "#aa00ff",
+        "Durango": "#d500f9",
+        "Guanajuato": "#673ab7",
+        "Guerrero": "#6200ea",
+        "Hidalgo": "#311b92",
+        "Jalisco": "#3f51b5",
+        "Estado de México": "#304ffe",
+        "Michoacán": "#1a237e",
+        "Morelos": "#0d47a1",
+        "Nayarit": "#1976d2",
+        "Nuevo León": "#00838f",
+        "Oaxaca": "#00796b",
+        "Puebla": "#004d40",
+        "Querétaro": "#616161",
+        "Quintana Roo": "#d32f2f",
+        "San Luis Potosí": "#4e342e",
+        "Sinaloa": "#795548",
+        "Sonora": "#ff3d00",
+        "Tabasco": "#ef6c00",
+        "Tamaulipas": "#827717",
+        "Tlaxcala": "#689f38",
+        "Veracruz": "#33691e",
+        "Yucatán": "#388e3c",
+        "Zacatecas": "#1b5e20",
+    }
+)
+
+
+# Tablas de consulta indexadas directamente por Clave_Ent.
+# La posición 0 queda vacía para que la clave sea el índice.
+# Nos permiten obtener nombres, abreviaciones y colores
+# de varias entidades en una sola operación.
+ENTIDAD_BY_CVE = np.array([""] + [ENTIDADES[i] for i in range(1, 33)])
+ABREV_BY_CVE = np.array([""] + [ABREVIACIONES[ENTIDADES[i]] for i in range(1, 33)])
+COLOR_BY_CVE = np.array([""] + [COLORES[ENTIDADES[i]] for i in range(1, 33)])
+
+for tabla in (ENTIDAD_BY_CVE, ABREV_BY_CVE, COLOR_BY_CVE):
+    tabla.flags.writeable = False
+
+
+# Los meses en el mismo orden que las columnas de los datasets.
+MESES = (
+    "Enero",
+    "Febrero",
+    "Marzo",
+    "Abril",
+    "Mayo",
+    "Junio",
+    "Julio",
+    "Agosto",
+    "Septiembre",
+    "Octubre",
+    "Noviembre",
+    "Diciembre",
+)
@@ -0,0 +1,58 @@
+"""
+Funciones para exportar las gráficas de los scripts de este repositorio.
+
+Las imágenes exportadas se guardan en la carpeta 'cache', así las
+figuras que no han cambiado no se vuelven a exportar con kaleido.
+
+"""
+
+import hashlib
+import os
+import shutil
+
+import plotly.io as pio
+
+
+def guardar_imagen(fig, ruta):
+    """
+    Exporta la figura como imagen en el formato de la extensión de la ruta.
+
+    Las imágenes se guardan en la carpeta 'cache' usando como nombre
+    un hash del contenido de la figura. Si la figura no ha cambiado,
+    se copia la imagen existente en lugar de volver a exportarla.
+
+    Primero se exporta a un archivo temporal y después se renombra,
+    así una exportación interrumpida no deja una imagen incompleta
+    que se copiaría en las siguientes ejecuciones.
+
+    La figura se convierte a diccionario una sola vez. Ese diccionario
+    se usa para el hash y para la exportación, la cual ya no lo valida,
+    pues plotly validó la figura al construirla.
+
+    Parameters
+    ----------
+    fig : go.Figure
+        La figura que se desea exportar.
+
+    ruta : str
+        La ruta del archivo final.
+
+    """
+
+    formato = os.path.splitext(ruta)[1].lstrip(".")
+
+    # El hash incluye los datos, textos y diseño de la figura.
+    especificacion = fig.to_dict()
+    texto = pio.to_json(especificacion, validate=False)
+    llave = hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+    archivo = f"./cache/{llave}.{formato}"
+
+    # Solo exportamos la imagen si no existe en la caché.
+    if not os.path.exists(archivo):
+        os.makedirs("./cache", exist_ok=True)
+
+        temporal = f"{archivo}.{os.getpid()}.tmp"
+        pio.write_image(especificacion, temporal, format=formato, validate=False)
+        os.replace(temporal, archivo)
+
+    shutil.copyfile(archivo, ruta)
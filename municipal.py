@@ -10,10 +10,13 @@ casos se suelen juntar varias víctimas en uno solo.
 """
 
 import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 
 
 # Todas las gráficas de este script
@@ -24,8 +27,95 @@ PAPER_BGCOLOR = "#2B2B2B"
 # La fecha en la que los datos fueron recopilados.
 FECHA_FUENTE = "marzo 2024"
 
+# Cada proceso inicia su propio kaleido con la primera imagen que exporta.
+# Nuestras gráficas no usan fórmulas, así que le evitamos cargar MathJax.
+if pio.kaleido.scope is not None:
+    pio.kaleido.scope.mathjax = None
 
-def crear_mapa(año, delito):
+
+@lru_cache(maxsize=None)
+def cargar_poblacion():
+    """
+    Carga el dataset de población por municipio, indexado por
+    la clave del municipio como cadena.
+
+    Se usa por más de una función, por lo que lo cargamos una sola vez.
+    El DataFrame es compartido, así que no debe ser modificado.
+
+    """
+
+    return pd.read_csv("./assets/poblacion.csv", dtype={"CVE": str}, index_col=0)
+
+
+@lru_cache(maxsize=None)
+def cargar_poblacion_nacional():
+    """
+    Calcula la población nacional de cada año, indexada por el año como cadena.
+
+    El cálculo se hace una sola vez y se reutiliza en cada llamada.
+    La Serie es compartida, así que no debe ser modificada.
+
+    """
+
+    # Sumamos todas las columnas de años.
+    return cargar_poblacion().iloc[:, 2:].sum(axis=0)
+
+
+@lru_cache(maxsize=None)
+def cargar_geojson():
+    """
+    Carga el GeoJSON de municipios de México.
+
+    Lo cargamos una sola vez para no volver a leerlo en cada mapa.
+    El diccionario es compartido, así que no debe ser modificado.
+
+    """
+
+    with open("./assets/mexico2020.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def cargar_contornos():
+    """
+    Extrae las coordenadas de los contornos de cada entidad
+    desde el GeoJSON de México.
+
+    Regresa dos tuplas con las longitudes y latitudes de todos los
+    contornos, separados por un valor nulo para que se dibujen
+    como líneas independientes.
+
+    """
+
+    # Cargamos el archivo GeoJSON de México.
+    with open("./assets/mexico.json", "r", encoding="utf-8") as f:
+        geojson = json.load(f)
+
+    longitudes = list()
+    latitudes = list()
+
+    for item in geojson["features"]:
+        geometria = item["geometry"]
+
+        # Los polígonos simples los tratamos como multipolígonos de un solo elemento.
+        if geometria["type"] == "Polygon":
+            poligonos = [geometria["coordinates"]]
+        else:
+            poligonos = geometria["coordinates"]
+
+        # Cada anillo de cada polígono es un contorno.
+        for poligono in poligonos:
+            for anillo in poligono:
+                longitudes.extend(punto[0] for punto in anillo)
+                latitudes.extend(punto[1] for punto in anillo)
+
+                longitudes.append(None)
+                latitudes.append(None)
+
+    return tuple(longitudes), tuple(latitudes)
+
+
+def crear_mapa(año, delito, pop=None, pop_nacional=None):
     """
     Crea un mapa choropleth con la incidencia
     del delito especificado.
@@ -38,18 +128,28 @@ def crear_mapa(año, delito):
     delito : str
         El nombre del delito que se desea graficar.
 
+    pop : pandas.DataFrame, optional
+        La población de cada municipio, como la regresa cargar_poblacion().
+        Si no se especifica, se carga.
+
+    pop_nacional : pandas.Series, optional
+        La población nacional de cada año. Si no se especifica, se calcula.
+
     """
 
-    # El índice lo vamos a necesitar como cadena.
-    pop_types = {"CVE": str}
+    # Cargamos los datasets de población en caso de no haberlos recibido.
+    if pop is None:
+        pop = cargar_poblacion()
 
-    # Cargamos el dataset de población por municipio.
-    pop = pd.read_csv("./assets/poblacion.csv", dtype=pop_types, index_col=0)
+    if pop_nacional is None:
+        pop_nacional = cargar_poblacion_nacional()
 
     # Seleccionamos las cifras del año de nuestro interés.
     pop = pop[str(año)]
 
-    types = {"cve_municipio": str}
+    # Los delitos se repiten en cada municipio, así que los leemos
+    # como categorías y el filtro compara códigos enteros.
+    types = {"cve_municipio": str, "delito": "category"}
 
     # Cargamos el dataset de dengue del año que nos interesa.
     df = pd.read_csv(
@@ -62,8 +162,8 @@ def crear_mapa(año, delito):
     # Calculamos el total de casos confirmados.
     total_registros = df["total"].sum()
 
-    # Calculamos el total de población del año que nos interesa.
-    total_pop = pop.sum()
+    # Tomamos el total de población del año que nos interesa.
+    total_pop = pop_nacional[str(año)]
 
     # Agregamos las cifras de población.
     df["poblacion"] = pop
@@ -99,38 +199,30 @@ def crear_mapa(año, delito):
 
     # Vamos a crear nuestra escala con 13 intervalos.
     marcas = np.linspace(valor_min, valor_max, 13)
-    etiquetas = list()
 
-    for item in marcas:
-        if item >= 10:
-            etiquetas.append(f"{item:,.0f}")
-        else:
-            etiquetas.append(f"{item:,.1f}")
+    # Escogemos el número de decimales según el rango de cada marca.
+    etiquetas = np.where(
+        marcas >= 10,
+        [f"{marca:,.0f}" for marca in marcas],
+        [f"{marca:,.1f}" for marca in marcas],
+    ).tolist()
 
     # A la última etiqueta le agregamos el símbolo de 'mayor o igual que'.
     etiquetas[-1] = f"≥{valor_max:,.0f}"
 
     # Cargamos el GeoJSON de municipios de México.
-    geojson = json.loads(open("./assets/mexico2020.json", "r", encoding="utf-8").read())
+    geojson = cargar_geojson()
 
     # Estas listas serán usadas para configurar el mapa Choropleth.
-    ubicaciones = list()
-    valores = list()
-
-    # Iteramos sobre cada municipio e nuestro GeoJSON.
-    for item in geojson["features"]:
-        geo = str(item["properties"]["CVEGEO"])
+    # Tomamos la clave de cada municipio de nuestro GeoJSON.
+    ubicaciones = [str(item["properties"]["CVEGEO"]) for item in geojson["features"]]
 
-        # Si el municipio no se encuentra en nuestro DataFrame,
-        # agregamos un valor nulo.
-        try:
-            value = df.loc[geo]["total"]
-        except Exception as _:
-            value = None
-
-        # Agregamos el objeto del municipio y su valor a las listas correspondientes.
-        ubicaciones.append(geo)
-        valores.append(value)
+    # Convertimos los totales a un diccionario una sola vez, así cada
+    # municipio se busca directamente por su clave en lugar de usar .loc.
+    # Si el municipio no se encuentra en nuestro DataFrame,
+    # agregamos un valor nulo.
+    totales = df["total"].to_dict()
+    valores = [totales.get(geo) for geo in ubicaciones]
 
     # Calculamos los valores para nuestro subtítulo.
     subtitulo = f"Nacional: {total_registros / total_pop * 100000:,.1f} ({total_registros:,.0f} registros)"
@@ -169,40 +261,20 @@ def crear_mapa(año, delito):
         )
     )
 
-    # Vamos a sobreponer otro mapa Choropleth, el cual
-    # tiene el único propósito de mostrar la división política
-    # de las entidades federativas.
-
-    # Cargamos el archivo GeoJSON de México.
-    geojson_borde = json.loads(
-        open("./assets/mexico.json", "r", encoding="utf-8").read()
-    )
-
-    # Estas listas serán usadas para configurar el mapa Choropleth.
-    ubicaciones_borde = list()
-    valores_borde = list()
-
-    # Iteramos sobre cada entidad dentro de nuestro archivo GeoJSON de México.
-    for item in geojson_borde["features"]:
-        geo = item["properties"]["NOMGEO"]
-
-        # Alimentamos las listas creadas anteriormente con la ubicación y su valor per capita.
-        ubicaciones_borde.append(geo)
-        valores_borde.append(1)
+    # Vamos a sobreponer los contornos de las entidades federativas,
+    # los cuales tienen el único propósito de mostrar la división política.
+    # Los dibujamos como líneas, ya que un segundo mapa Choropleth
+    # transparente es más costoso de renderizar.
+    longitudes, latitudes = cargar_contornos()
 
-    # Este mapa tiene mucho menos personalización.
-    # Lo único que necesitamos es que muestre los contornos
-    # de cada entidad.
     fig.add_traces(
-        go.Choropleth(
-            geojson=geojson_borde,
-            locations=ubicaciones_borde,
-            z=valores_borde,
-            featureidkey="properties.NOMGEO",
-            colorscale=["hsla(0, 0, 0, 0)", "hsla(0, 0, 0, 0)"],
-            marker_line_color="#FFFFFF",
-            marker_line_width=4,
-            showscale=False,
+        go.Scattergeo(
+            lon=longitudes,
+            lat=latitudes,
+            mode="lines",
+            line_color="#FFFFFF",
+            line_width=4,
+            showlegend=False,
         )
     )
 
@@ -293,7 +365,7 @@ def crear_mapa(año, delito):
     fig.write_image(f"./municipal_{año}.png")
 
 
-def tasa_municipios(año, delito):
+def tasa_municipios(año, delito, pop=None):
     """
     Crea una tabla desglosando los 30 municipios con mayor
     tasa del delito especificado.
@@ -306,34 +378,39 @@ def tasa_municipios(año, delito):
     delito : str
         El nombre del delito que se desea graficar.
 
+    pop : pandas.DataFrame, optional
+        La población de cada municipio, como la regresa cargar_poblacion().
+        Si no se especifica, se carga.
+
     """
 
-    # El índice lo vamos a necesitar como cadena.
-    pop_types = {"CVE": str}
+    # Cargamos el dataset de población en caso de no haberlo recibido.
+    if pop is None:
+        pop = cargar_poblacion()
 
-    # Cargamos el dataset de población por municipio.
-    pop = pd.read_csv("./assets/poblacion.csv", dtype=pop_types, index_col=0)
+    # Seleccionamos las columnas de nuestro interés.
+    pop = pop[["Entidad", "Municipio", str(año)]]
 
     # Renombramos algunos estados a sus nombres más comunes.
-    pop["Entidad"] = pop["Entidad"].replace(
+    # replace() regresa un nuevo DataFrame, así no modificamos el compartido.
+    pop = pop.replace(
         {
-            "Coahuila de Zaragoza": "Coahuila",
-            "México": "Estado de México",
-            "Michoacán de Ocampo": "Michoacán",
-            "Veracruz de Ignacio de la Llave": "Veracruz",
+            "Entidad": {
+                "Coahuila de Zaragoza": "Coahuila",
+                "México": "Estado de México",
+                "Michoacán de Ocampo": "Michoacán",
+                "Veracruz de Ignacio de la Llave": "Veracruz",
+            }
         }
     )
 
-    # Seleccionamos las columnas de nuestro interés.
-    pop = pop[["Entidad", "Municipio", str(año)]]
-
     # Renombramos las columnas.
     pop.columns = ["entidad", "municipio", "poblacion"]
 
     # Cargamos el dataset municipal con datos anuales.
     df = pd.read_csv(
         "./data/timeseries_municipal.csv",
-        dtype={"cve_municipio": str},
+        dtype={"cve_municipio": str, "delito": "category"},
     )
 
     # Seleccionamos el año de nuestro interés.
@@ -359,13 +436,13 @@ def tasa_municipios(año, delito):
     # es muy pequeña y resulta en tasas muy grandes.
     df = df[df["poblacion"] >= 50000]
 
-    # Ordenamos los resultados por la tasa de mayor a menor.
-    df.sort_values("tasa", ascending=False, inplace=True)
+    # Escogemos el top 30 ordenado por la tasa de mayor a menor.
+    # nlargest evita ordenar todos los municipios para quedarnos con 30.
+    df = df.nlargest(30, "tasa")
 
-    # Reseteamos el índice y solo escogemos el top 30.
+    # Reseteamos el índice para que empiece en 1.
     df.reset_index(inplace=True)
     df.index += 1
-    df = df.head(30)
 
     subtitulo = "Municipios con al menos 50k habs."
 
@@ -439,7 +516,7 @@ def tasa_municipios(año, delito):
     fig.write_image("./tabla_tasa.png")
 
 
-def absolutos_municipios(año, delito):
+def absolutos_municipios(año, delito, pop=None):
     """
     Crea una tabla desglosando los 30 municipios con mayor
     incidencia del delito especificado.
@@ -452,34 +529,39 @@ def absolutos_municipios(año, delito):
     delito : str
         El nombre del delito que se desea graficar.
 
+    pop : pandas.DataFrame, optional
+        La población de cada municipio, como la regresa cargar_poblacion().
+        Si no se especifica, se carga.
+
     """
 
-    # El índice lo vamos a necesitar como cadena.
-    pop_types = {"CVE": str}
+    # Cargamos el dataset de población en caso de no haberlo recibido.
+    if pop is None:
+        pop = cargar_poblacion()
 
-    # Cargamos el dataset de población por municipio.
-    pop = pd.read_csv("./assets/poblacion.csv", dtype=pop_types, index_col=0)
+    # Seleccionamos las columnas de nuestro interés.
+    pop = pop[["Entidad", "Municipio", str(año)]]
 
     # Renombramos algunos estados a sus nombres más comunes.
-    pop["Entidad"] = pop["Entidad"].replace(
+    # replace() regresa un nuevo DataFrame, así no modificamos el compartido.
+    pop = pop.replace(
         {
-            "Coahuila de Zaragoza": "Coahuila",
-            "México": "Estado de México",
-            "Michoacán de Ocampo": "Michoacán",
-            "Veracruz de Ignacio de la Llave": "Veracruz",
+            "Entidad": {
+                "Coahuila de Zaragoza": "Coahuila",
+                "México": "Estado de México",
+                "Michoacán de Ocampo": "Michoacán",
+                "Veracruz de Ignacio de la Llave": "Veracruz",
+            }
         }
     )
 
-    # Seleccionamos las columnas de nuestro interés.
-    pop = pop[["Entidad", "Municipio", str(año)]]
-
     # Renombramos las columnas.
     pop.columns = ["entidad", "municipio", "poblacion"]
 
     # Cargamos el dataset municipal con datos anuales.
     df = pd.read_csv(
         "./data/timeseries_municipal.csv",
-        dtype={"cve_municipio": str},
+        dtype={"cve_municipio": str, "delito": "category"},
     )
 
     # Seleccionamos el año de nuestro interés.
@@ -500,13 +582,13 @@ def absolutos_municipios(año, delito):
     # Creamos la columna de nombre que se compone del nombre de la entidad y municipio.
     df["nombre"] = df["municipio"] + ", " + df["entidad"]
 
-    # Ordenamos los resultados por la tasa de mayor a menor.
-    df.sort_values("total", ascending=False, inplace=True)
+    # Escogemos el top 30 ordenado por el total de mayor a menor.
+    # nlargest evita ordenar todos los municipios para quedarnos con 30.
+    df = df.nlargest(30, "total")
 
-    # Reseteamos el índice y solo escogemos el top 30.
+    # Reseteamos el índice para que empiece en 1.
     df.reset_index(inplace=True)
     df.index += 1
-    df = df.head(30)
 
     subtitulo = ""
 
@@ -581,6 +663,23 @@ def absolutos_municipios(año, delito):
 
 
 if __name__ == "__main__":
-    crear_mapa(2023, "Extorsión")
-    tasa_municipios(2023, "Extorsión")
-    absolutos_municipios(2023, "Extorsión")
+    # Cargamos la población una sola vez y la compartimos con cada proceso,
+    # ya que cada proceso tiene su propia caché de lru_cache.
+    poblacion = cargar_poblacion()
+    poblacion_nacional = cargar_poblacion_nacional()
+
+    # Cada gráfica es independiente, así que las creamos en paralelo.
+    # Usamos procesos, ya que cada uno exporta con su propio kaleido.
+    # Por defecto se usa un proceso por cada núcleo disponible.
+    with ProcessPoolExecutor() as executor:
+        tareas = [
+            executor.submit(
+                crear_mapa, 2023, "Extorsión", poblacion, poblacion_nacional
+            ),
+            executor.submit(tasa_municipios, 2023, "Extorsión", poblacion),
+            executor.submit(absolutos_municipios, 2023, "Extorsión", poblacion),
+        ]
+
+    # Mostramos cualquier error ocurrido dentro de los procesos.
+    for tarea in tareas:
+        tarea.result()
@@ -8,34 +8,30 @@ https://www.gob.mx/sesnsp/acciones-y-programas/datos-abiertos-de-incidencia-deli
 
 """
 
-import csv
-from datetime import date
-
+import numpy as np
 import pandas as pd
 
-# Este diccionario será usado para crear las fechas.
-MESES = {
-    "Enero": 1,
-    "Febrero": 2,
-    "Marzo": 3,
-    "Abril": 4,
-    "Mayo": 5,
-    "Junio": 6,
-    "Julio": 7,
-    "Agosto": 8,
-    "Septiembre": 9,
-    "Octubre": 10,
-    "Noviembre": 11,
-    "Diciembre": 12,
-}
-
-
-def convert_to_timeseries(file):
-    # Iniciamos nuestra lista con la cabecera.
-    data_list = [["isodate", "entidad", "delito", "total"]]
-
-    # Cargamos el dataset con codificación latin-1.
-    df = pd.read_csv(f"./data/{file}.csv", encoding="latin-1", thousands=",")
+from constants import MESES
+
+
+def load_dataset(file):
+    """
+    Carga uno de los datasets del SESNSP con codificación latin-1.
+
+    El dataset estatal es usado por más de una función, por lo que
+    conviene cargarlo una sola vez y compartirlo.
+    """
+
+    return pd.read_csv(f"./data/{file}.csv", encoding="latin-1", thousands=",")
+
+
+def convert_to_timeseries(file, df=None):
+    # Cargamos el dataset en caso de no haberlo recibido.
+    if df is None:
+        df = load_dataset(file)
+
+    # Obtenemos una lista de todos los años en nuestro dataset.
+    años = df["Año"].unique().tolist()
 
     # Obtenemos una lista de todos los subtipos de delitos.
     delitos = df["Subtipo de delito"].unique().tolist()
@@ -43,37 +39,58 @@ def convert_to_timeseries(file):
     # Obtenemos una lista de todas las entidades federativas de México.
     entidades = df["Entidad"].unique().tolist()
 
-    # Insertamos una entidad para el nivel nacional.
-    entidades.insert(0, "Nacional")
+    # Creamos las fechas de cada mes una sola vez por año,
+    # en lugar de crearlas para cada registro.
+    fechas = np.array(
+        [
+            np.arange(f"{year}-01", f"{year + 1}-01", dtype="datetime64[M]")
+            for year in años
+        ]
+    ).astype("datetime64[D]")
+
+    # Descartamos los registros sin incidencia en todo el año.
+    # No aportan nada a las sumas y así las agrupaciones
+    # trabajan con menos filas.
+    df = df[df[list(MESES)].fillna(0).to_numpy().any(axis=1)]
+
+    # Agrupamos una sola vez por año, entidad y subtipo de delito.
+    # El resultado lo acomodamos en una matriz de años, entidades, delitos y meses,
+    # rellenando con ceros las combinaciones sin registros.
+    matriz = (
+        df.groupby(["Año", "Entidad", "Subtipo de delito"])[list(MESES)]
+        .sum()
+        .reindex(pd.MultiIndex.from_product([años, entidades, delitos]), fill_value=0)
+        .to_numpy(dtype=np.int64)
+        .reshape(len(años), len(entidades), len(delitos), len(MESES))
+    )
 
-    # iteramos sobre cada año en nuestro dataset.
-    for year in df["Año"].unique():
-        # Iteramos sobre cada entidad.
-        for entidad in entidades:
-            # Si la entidad es 'Nacional' hacemos otro tipo de filtrado.
-            if entidad == "Nacional":
-                temp_df = df[df["Año"] == year]
-            else:
-                temp_df = df[(df["Año"] == year) & (df["Entidad"] == entidad)]
-
-            # Agrupamos el DataFrame por subtipo de delito.
-            temp_df = temp_df.groupby("Subtipo de delito").sum(numeric_only=True)
-
-            # Iteramos sobre cada subtipo de delito.
-            for delito in delitos:
-                # iteramos sobre cada mes.
-                for k, v in MESES.items():
-                    # Finalmente armamos el registro con todos los valores
-                    # que estamos iterando.
-                    data_list.append(
-                        [date(year, v, 1), entidad, delito, int(temp_df.loc[delito, k])]
-                    )
+    # Insertamos una entidad para el nivel nacional,
+    # la cual es la suma de todas las entidades.
+    entidades.insert(0, "Nacional")
+    matriz = np.concatenate([matriz.sum(axis=1, keepdims=True), matriz], axis=1)
+
+    # Armamos todos los registros de una sola vez, extendiendo
+    # las fechas, entidades y delitos a la forma de la matriz.
+    final = pd.DataFrame(
+        {
+            "isodate": np.broadcast_to(fechas[:, None, None, :], matriz.shape).ravel(),
+            "entidad": np.broadcast_to(
+                np.array(entidades)[None, :, None, None], matriz.shape
+            ).ravel(),
+            "delito": np.broadcast_to(
+                np.array(delitos)[None, None, :, None], matriz.shape
+            ).ravel(),
+            "total": matriz.ravel(),
+        }
+    )
 
     # Guardamos el archivo final con un prefijo.
-    with open(
-        f"./data/timeseries_{file}.csv", "w", encoding="utf-8", newline=""
-    ) as csv_file:
-        csv.writer(csv_file).writerows(data_list)
+    final.to_csv(
+        f"./data/timeseries_{file}.csv",
+        index=False,
+        encoding="utf-8",
+        lineterminator="\r\n",
+    )
 
 
 def municipios_to_timeseries():
@@ -86,13 +103,17 @@ def municipios_to_timeseries():
     """
 
     # Cargamos el dataset de municipios con codificación latin-1.
-    df = pd.read_csv("./data/municipal.csv", encoding="latin-1", thousands=",")
-
-    # Arreglamos la clave del municipio.
-    df["Cve. Municipio"] = df["Cve. Municipio"].astype(str).str.zfill(5)
+    # La clave del municipio la leemos como entero, lo cual
+    # ocupa menos memoria y es más rápido de agrupar.
+    df = pd.read_csv(
+        "./data/municipal.csv",
+        encoding="latin-1",
+        thousands=",",
+        dtype={"Cve. Municipio": "int32"},
+    )
 
     # Esta lista de meses será usada para calcular el total anual.
-    meses = [item for item in MESES.keys()]
+    meses = list(MESES)
 
     # Calculamos los totales anuales de cada delito.
     df["total"] = df[meses].sum(axis=1)
@@ -111,6 +132,9 @@ def municipios_to_timeseries():
     # Convertimos el total a int.
     df["total"] = df["total"].astype(int)
 
+    # Arreglamos la clave del municipio, ya con los registros agrupados.
+    df["cve_municipio"] = np.char.zfill(df["cve_municipio"].to_numpy().astype("U5"), 5)
+
     # Guardamos el nuevo archivo .csv
     df.to_csv(
         "./data/timeseries_municipal.csv",
@@ -120,66 +144,116 @@ def municipios_to_timeseries():
     )
 
 
-def robos_to_timeseries():
+def robos_to_timeseries(df=None):
     """
     Genera series de tiempo para cada tipo de robo por entidad.
-    """
 
-    # Iniciamos nuestra lista con la cabecera.
-    data_list = [["isodate", "entidad", "delito", "modalidad", "total"]]
+    Parameters
+    ----------
+    df : pd.DataFrame, optional
+        El dataset estatal ya cargado. Si no se especifica,
+        se carga desde el disco.
+
+    """
 
-    # Cargamos el dataset con codificación latin-1.
-    df = pd.read_csv("./data/estatal.csv", encoding="latin-1", thousands=",")
+    # Cargamos el dataset estatal en caso de no haberlo recibido.
+    if df is None:
+        df = load_dataset("estatal")
 
     # Seleccionamos solo los delitos clasificados como robo.
     df = df[df["Tipo de delito"] == "Robo"]
 
+    # Obtenemos una lista de todos los años en nuestro dataset.
+    años = df["Año"].unique().tolist()
+
+    # Obtenemos el catálogo de subtipos de robo y sus modalidades.
+    catalogo = (
+        pd.MultiIndex.from_frame(
+            df[["Subtipo de delito", "Modalidad"]].drop_duplicates()
+        )
+        .sort_values()
+        .tolist()
+    )
+
     # Obtenemos una lista de todas las entidades federativas de México.
     entidades = df["Entidad"].unique().tolist()
 
-    # Insertamos una entidad para el nivel nacional.
-    entidades.insert(0, "Nacional")
+    # Creamos las fechas de cada mes una sola vez por año,
+    # en lugar de crearlas para cada registro.
+    fechas = np.array(
+        [
+            np.arange(f"{year}-01", f"{year + 1}-01", dtype="datetime64[M]")
+            for year in años
+        ]
+    ).astype("datetime64[D]")
+
+    # Descartamos los registros sin incidencia en todo el año.
+    # No aportan nada a las sumas y así las agrupaciones
+    # trabajan con menos filas.
+    df = df[df[list(MESES)].fillna(0).to_numpy().any(axis=1)]
+
+    # Todas las combinaciones de año, entidad, subtipo de robo y modalidad.
+    indice = pd.MultiIndex.from_tuples(
+        [
+            (year, entidad, delito, modalidad)
+            for year in años
+            for entidad in entidades
+            for delito, modalidad in catalogo
+        ]
+    )
+
+    # Agrupamos una sola vez por año, entidad, subtipo de delito y modalidad.
+    # El resultado lo acomodamos en una matriz de años, entidades, combinaciones
+    # y meses, rellenando con ceros las combinaciones sin registros.
+    matriz = (
+        df.groupby(["Año", "Entidad", "Subtipo de delito", "Modalidad"])[list(MESES)]
+        .sum()
+        .reindex(indice, fill_value=0)
+        .to_numpy(dtype=np.int64)
+        .reshape(len(años), len(entidades), len(catalogo), len(MESES))
+    )
 
-    # iteramos sobre cada año en nuestro dataset.
-    for year in df["Año"].unique():
-        # Iteramos sobre cada entidad.
-        for entidad in entidades:
-            # Si la entidad es 'Nacional' hacemos otro tipo de filtrado.
-            if entidad == "Nacional":
-                temp_df = df[df["Año"] == year]
-            else:
-                temp_df = df[(df["Año"] == year) & (df["Entidad"] == entidad)]
-
-            # Agrupamos el DataFrame por subtipo de delito y modalidad.
-            temp_df = temp_df.groupby(["Subtipo de delito", "Modalidad"]).sum(
-                numeric_only=True
-            )
-
-            # Iteramos sobre cada subtipo de delito.
-            for delito, modalidad in temp_df.index:
-                # iteramos sobre cada mes.
-                for k, v in MESES.items():
-                    # Finalmente armamos el registro con todos los valores
-                    # que estamos iterando.
-                    data_list.append(
-                        [
-                            date(year, v, 1),
-                            entidad,
-                            delito,
-                            modalidad,
-                            int(temp_df.loc[delito, modalidad][k]),
-                        ]
-                    )
+    # Insertamos una entidad para el nivel nacional,
+    # la cual es la suma de todas las entidades.
+    entidades.insert(0, "Nacional")
+    matriz = np.concatenate([matriz.sum(axis=1, keepdims=True), matriz], axis=1)
+
+    # Separamos el catálogo en subtipos de robo y modalidades.
+    delitos = np.array([delito for delito, _ in catalogo])
+    modalidades = np.array([modalidad for _, modalidad in catalogo])
+
+    # Armamos todos los registros de una sola vez, extendiendo
+    # las fechas, entidades, delitos y modalidades a la forma de la matriz.
+    final = pd.DataFrame(
+        {
+            "isodate": np.broadcast_to(fechas[:, None, None, :], matriz.shape).ravel(),
+            "entidad": np.broadcast_to(
+                np.array(entidades)[None, :, None, None], matriz.shape
+            ).ravel(),
+            "delito": np.broadcast_to(
+                delitos[None, None, :, None], matriz.shape
+            ).ravel(),
+            "modalidad": np.broadcast_to(
+                modalidades[None, None, :, None], matriz.shape
+            ).ravel(),
+            "total": matriz.ravel(),
+        }
+    )
 
     # Guardamos el archivo final con un prefijo.
-    with open(
-        "./data/timeseries_robos.csv", "w", encoding="utf-8", newline=""
-    ) as csv_file:
-        csv.writer(csv_file).writerows(data_list)
+    final.to_csv(
+        "./data/timeseries_robos.csv",
+        index=False,
+        encoding="utf-8",
+        lineterminator="\r\n",
+    )
 
 
 if __name__ == "__main__":
+    # El dataset estatal se usa dos veces, así que solo lo cargamos una vez.
+    estatal = load_dataset("estatal")
+
     convert_to_timeseries("victimas")
-    convert_to_timeseries("estatal")
+    convert_to_timeseries("estatal", estatal)
     municipios_to_timeseries()
-    robos_to_timeseries()
+    robos_to_timeseries(estatal)
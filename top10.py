@@ -5,135 +5,112 @@ https://www.ieec.org.mx/transparencia/doctos/art74/i/reglamentos/Reglamento_de_e
 
 """
 
+import gc
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
 from textwrap import wrap
 
+from constants import ABREV_BY_CVE, COLOR_BY_CVE, ENTIDAD_BY_CVE, MESES
+from imagenes import guardar_imagen
+
 
 # La fecha en la que los datos fueron recopilados.
 FECHA_FUENTE = "febrero 2024"
 
-ENTIDADES = {
-    1: "Aguascalientes",
-    2: "Baja California",
-    3: "Baja California Sur",
-    4: "Campeche",
-    5: "Coahuila",
-    6: "Colima",
-    7: "Chiapas",
-    8: "Chihuahua",
-    9: "Ciudad de México",
-    10: "Durango",
-    11: "Guanajuato",
-    12: "Guerrero",
-    13: "Hidalgo",
-    14: "Jalisco",
-    15: "Estado de México",
-    16: "Michoacán",
-    17: "Morelos",
-    18: "Nayarit",
-    19: "Nuevo León",
-    20: "Oaxaca",
-    21: "Puebla",
-    22: "Querétaro",
-    23: "Quintana Roo",
-    24: "San Luis Potosí",
-    25: "Sinaloa",
-    26: "Sonora",
-    27: "Tabasco",
-    28: "Tamaulipas",
-    29: "Tlaxcala",
-    30: "Veracruz",
-    31: "Yucatán",
-    32: "Zacatecas",
-}
-
-
-ABREVIACIONES = {
-    "Aguascalientes": "AGS",
-    "Baja California": "BC",
-    "Baja California Sur": "BCS",
-    "Campeche": "CAMP",
-    "Coahuila": "COAH",
-    "Colima": "COL",
-    "Chiapas": "CHIS",
-    "Chihuahua": "CHIH",
-    "Ciudad de México": "CDMX",
-    "Durango": "DGO",
-    "Guanajuato": "GTO",
-    "Guerrero": "GRO",
-    "Hidalgo": "HGO",
-    "Jalisco": "JAL",
-    "Estado de México": "MEX",
-    "Michoacán": "MICH",
-    "Morelos": "MOR",
-    "Nayarit": "NAY",
-    "Nuevo León": "NL",
-    "Oaxaca": "OAX",
-    "Puebla": "PUE",
-    "Querétaro": "QRO",
-    "Quintana Roo": "QROO",
-    "San Luis Potosí": "SLP",
-    "Sinaloa": "SIN",
-    "Sonora": "SON",
-    "Tabasco": "TAB",
-    "Tamaulipas": "TAMPS",
-    "Tlaxcala": "TLAX",
-    "Veracruz": "VER",
-    "Yucatán": "YUC",
-    "Zacatecas": "ZAC",
-}
-
-
-COLORES = {
-    "Aguascalientes": "#f44336",
-    "Baja California": "#d50000",
-    "Baja California Sur": "#455a64",
-    "Campeche": "#e91e63",
-    "Coahuila": "#c51162",
-    "Colima": "#880e4f",
-    "Chiapas": "#9c27b0",
-    "Chihuahua": "#4a148c",
-    "Ciudad de México": "#aa00ff",
-    "Durango": "#d500f9",
-    "Guanajuato": "#673ab7",
-    "Guerrero": "#6200ea",
-    "Hidalgo": "#311b92",
-    "Jalisco": "#3f51b5",
-    "Estado de México": "#304ffe",
-    "Michoacán": "#1a237e",
-    "Morelos": "#0d47a1",
-    "Nayarit": "#1976d2",
-    "Nuevo León": "#00838f",
-    "Oaxaca": "#00796b",
-    "Puebla": "#004d40",
-    "Querétaro": "#616161",
-    "Quintana Roo": "#d32f2f",
-    "San Luis Potosí": "#4e342e",
-    "Sinaloa": "#795548",
-    "Sonora": "#ff3d00",
-    "Tabasco": "#ef6c00",
-    "Tamaulipas": "#827717",
-    "Tlaxcala": "#689f38",
-    "Veracruz": "#33691e",
-    "Yucatán": "#388e3c",
-    "Zacatecas": "#1b5e20",
-}
-
-
-MESES = [
-    "Enero",
-    "Febrero",
-    "Marzo",
-    "Abril",
-    "Mayo",
-    "Junio",
-    "Julio",
-    "Agosto",
-    "Septiembre",
-    "Octubre",
-    "Noviembre",
-    "Diciembre",
+# Nuestras gráficas no usan fórmulas, así que no necesitamos
+# que kaleido cargue MathJax al iniciar.
+if pio.kaleido.scope is not None:
+    pio.kaleido.scope.mathjax = None
+
+# El diseño de ambas figuras es el mismo, así que lo definimos
+# una sola vez como plantilla en lugar de reconstruirlo en cada llamada.
+# La combinamos con la plantilla de plotly (de la cual tomamos el color
+# de las líneas de los ejes) y cada figura la indica de forma explícita,
+# así no modificamos la plantilla por defecto de otros scripts.
+pio.templates["incidencia"] = pio.templates.merge_templates(
+    "plotly",
+    go.layout.Template(
+        layout=dict(
+            xaxis=dict(
+                range=[-0.75, 9.75],
+                showticklabels=False,
+                ticklen=10,
+                zeroline=False,
+                title_standoff=20,
+                tickcolor="#FFFFFF",
+                linewidth=2,
+                showline=True,
+                mirror=True,
+                showgrid=False,
+                nticks=0,
+            ),
+            yaxis=dict(
+                range=[12.75, -0.75],
+                ticks="outside",
+                ticklen=10,
+                zeroline=False,
+                title_standoff=12,
+                tickcolor="#FFFFFF",
+                linewidth=2,
+                showline=True,
+                mirror=True,
+                showgrid=False,
+                nticks=0,
+            ),
+            showlegend=False,
+            width=1280,
+            height=1600,
+            font_family="Montserrat",
+            font_color="white",
+            font_size=18,
+            title_x=0.5,
+            title_y=0.975,
+            margin_t=100,
+            margin_l=220,
+            margin_r=40,
+            margin_b=60,
+            title_font_size=26,
+            plot_bgcolor="#100F0F",
+            paper_bgcolor="#0F3D3E",
+        )
+    ),
+)
+
+# Las anotaciones tampoco cambian entre figuras, así que las creamos una sola vez.
+# No van en la plantilla, ya que ahí no reciben los estilos por defecto de plotly.
+ANOTACIONES = [
+    dict(
+        x=0.01,
+        xanchor="left",
+        xref="paper",
+        y=-0.05,
+        yanchor="bottom",
+        yref="paper",
+        text=f"Fuente: SESNSP ({FECHA_FUENTE})",
+    ),
+    dict(
+        x=0.55,
+        xanchor="center",
+        xref="paper",
+        y=-0.05,
+        yanchor="bottom",
+        yref="paper",
+        text="Incidencia delictiva ajustada por cada 100k habitantes",
+    ),
+    dict(
+        x=1.01,
+        xanchor="right",
+        xref="paper",
+        y=-0.05,
+        yanchor="bottom",
+        yref="paper",
+        text="🧁 @lapanquecita",
+    ),
 ]
 
 DELITOS = [
@@ -153,28 +130,25 @@ DELITOS = [
 ]
 
 
-def main(tipo, año):
+@lru_cache(maxsize=None)
+def cargar_poblacion(año):
     """
-    Crea una gráfica con el top 10 o bottom 10 de incidencia deliactiva por entidad.
+    Carga la población total por entidad del año especificado,
+    indexada por el nombre común de cada entidad.
 
     Parameters
     ----------
-    tipo : str
-        El tipo de orden, pueden ser 'top' o 'bottom'.
-
     año : int
-        El año que nos interesa graficar.
+        El año de nuestro interés.
 
     """
 
     # Cargamos el dataset de población total por entidad.
-    pop = pd.read_csv("./assets/poblacion.csv")
+    # Solo leemos la columna del año de nuestro interés.
+    pop = pd.read_csv("./assets/poblacion.csv", usecols=["Entidad", str(año)])
 
     # Calculamos la población total por entidad.
-    pop = pop.groupby("Entidad").sum(numeric_only=True)
-
-    # Seleccionamos la población del año que nos interesa.
-    pop = pop[str(año)]
+    pop = pop.groupby("Entidad")[str(año)].sum()
 
     # Renombramos algunos estados a sus nombres más comunes.
     pop = pop.rename(
@@ -186,14 +160,106 @@ def main(tipo, año):
         }
     )
 
+    return pop
+
+
+@lru_cache(maxsize=None)
+def cargar_incidencia(año):
+    """
+    Carga el dataset de incidencia delictiva estatal del año especificado
+    y calcula el total anual de cada subtipo de delito por entidad.
+
+    El resultado es una tabla con los subtipos de delito como índice
+    y las claves de las entidades (Clave_Ent) como columnas.
+
+    Parameters
+    ----------
+    año : int
+        El año de nuestro interés.
+
+    """
+
     # Cargamos el dataset de incidencia delictiva estatal.
-    df = pd.read_csv("./data/estatal.csv", encoding="latin-1")
+    # Solo leemos las columnas que vamos a utilizar.
+    # Los subtipos de delito se leen como categorías y las claves
+    # de entidad como enteros pequeños, así la agrupación compara
+    # códigos enteros en lugar de cadenas de texto.
+    df = pd.read_csv(
+        "./data/estatal.csv",
+        encoding="latin-1",
+        usecols=["Año", "Clave_Ent", "Subtipo de delito", *MESES],
+        dtype={"Año": "int16", "Clave_Ent": "int8", "Subtipo de delito": "category"},
+    )
 
     # Filtramos los registros para el año de nuestro interés.
+    # El año es un entero pequeño, así que la comparación es muy barata.
     df = df[df["Año"] == año]
 
     # Calculamos los totales anuales de cada delito.
-    df["total"] = df[MESES].sum(axis=1)
+    df["total"] = df[list(MESES)].sum(axis=1)
+
+    # Agrupamos todos los subtipos de delito y entidades en una sola pasada.
+    return (
+        df.groupby(["Subtipo de delito", "Clave_Ent"], observed=True)["total"]
+        .sum()
+        .unstack(fill_value=0)
+    )
+
+
+@lru_cache(maxsize=None)
+def calcular_tasas(año):
+    """
+    Calcula el total anual y la tasa por cada 100k habitantes
+    de cada entidad (Clave_Ent) para todos los grupos de DELITOS.
+
+    Regresa una lista de DataFrames en el mismo orden que DELITOS.
+    Las gráficas de top y bottom solo difieren en el orden,
+    así que ambas comparten este resultado.
+
+    Parameters
+    ----------
+    año : int
+        El año de nuestro interés.
+
+    """
+
+    # Cargamos la población y la incidencia del año, ambas están en caché.
+    pop = cargar_poblacion(año)
+    df = cargar_incidencia(año)
+
+    # Creamos una matriz donde cada fila es un grupo de DELITOS
+    # y cada columna un subtipo de delito, con 1 si el subtipo pertenece al grupo.
+    grupos = np.array([df.index.isin(item) for item in DELITOS], dtype=np.int64)
+
+    # Con una sola multiplicación de matrices obtenemos
+    # el total de cada grupo de delitos para todas las entidades.
+    totales = grupos @ df.to_numpy()
+
+    # Obtenemos la población de cada entidad, emparejándola por su nombre.
+    poblacion = pop.reindex(ENTIDAD_BY_CVE[df.columns]).to_numpy()
+
+    # Calculamos la incidencia por cada 100k habitantes de todos los grupos a la vez.
+    tasas = totales / poblacion * 100000
+
+    return [
+        pd.DataFrame({"total": t, "pop": poblacion, "tasa": r}, index=df.columns)
+        for t, r in zip(totales, tasas)
+    ]
+
+
+def crear_figura(tipo, año):
+    """
+    Crea la figura con el top 10 o bottom 10 de incidencia deliactiva por entidad.
+
+    Parameters
+    ----------
+    tipo : str
+        El tipo de orden, pueden ser 'top' o 'bottom'.
+
+    año : int
+        El año que nos interesa graficar.
+
+    """
 
     # El título depende del tipo de orden.
     if tipo == "top":
@@ -201,45 +267,41 @@ def main(tipo, año):
     elif tipo == "bottom":
         titulo = "menor"
 
-    fig = go.Figure()
+    fig = go.Figure(
+        layout=dict(
+            template="incidencia",
+            annotations=ANOTACIONES,
+            title_text=f"Las 10 entidades de México con <b>{titulo}</b> incidencia delictiva por tipo de delito durante el {año}<br>(un registro puede tener más de una víctima)",
+        )
+    )
 
-    # Iteramos sobre los delitos que nos interesan
-    for item in DELITOS:
-        # Creamos un DataFrame con el delito o delitos.
-        temp_df = df[df["Subtipo de delito"].isin(item)]
+    # Acumulamos los puntos de todos los delitos para dibujarlos
+    # con una sola traza en lugar de una traza por delito.
+    x, y, textos, colores = [], [], [], []
 
-        # Agrupamos el DataFrame por entidad y solo nos quedamos con la columna del total por año.
-        temp_df = (
-            temp_df[["Clave_Ent", "total"]].groupby("Clave_Ent").sum(numeric_only=True)
-        )
+    # Iteramos sobre los delitos que nos interesan junto con
+    # el total y la tasa de cada entidad para el delito o delitos.
+    for item, temp_df in zip(DELITOS, calcular_tasas(año)):
 
         # Este es el total nacional, el cual será usado para las etiquetas.
         total = temp_df["total"].sum()
 
-        # Renombramos los valores del índice para poder emparejarlos con la población.
-        temp_df.index = temp_df.index.map(ENTIDADES)
-
-        # Agregamos la población de cada entidad.
-        temp_df["pop"] = pop
-
-        # Calculamos la incidencia por cada 100k habitantes.
-        temp_df["tasa"] = temp_df["total"] / temp_df["pop"] * 100000
-
         # Esta linea es la más importante de todas, ya que ordena los valores calculados
         #  y solo toma los que necesitamos (top 10)
         if tipo == "top":
-            temp_df = temp_df.sort_values("tasa", ascending=False).head(10)
+            temp_df = temp_df.nlargest(10, "tasa")
         elif tipo == "bottom":
-            temp_df = temp_df.sort_values("tasa", ascending=True).head(10)
+            temp_df = temp_df.nsmallest(10, "tasa")
 
-        # Reseteamos el indice, ya que necesitamos valores del 0 al 6
-        temp_df.reset_index(inplace=True)
+        # El índice contiene la clave de cada entidad,
+        # la cual es su posición en las tablas de consulta.
+        cve = temp_df.index.to_numpy()
 
         # Aquí creamos los textos para cada entidad y tasa.
-        temp_df["text"] = temp_df.apply(formatear_texto, axis=1)
-
-        # Definimos el color de cada círculo usando el diccionario de colores.
-        temp_df["color"] = temp_df["Clave_Ent"].map(COLORES)
+        # Junto con el color de cada círculo, los guardamos en arreglos
+        # en lugar de agregarlos como columnas al DataFrame.
+        textos.append(formatear_texto(temp_df["tasa"].to_numpy(), ABREV_BY_CVE[cve]))
+        colores.append(COLOR_BY_CVE[cve])
 
         # Unimos los nombres de delitos y los partimos en dos en caso de ser muy largos.
         item = " y ".join(item)
@@ -247,118 +309,93 @@ def main(tipo, año):
 
         # El eje vertical va a ser el nombre del delito 10 veces.
         # Esto es como un hack para que nuestra visualización funcione.
-        y = [f"<b>{item}</b><br>({total:,.0f} registros)" for _ in range(len(temp_df))]
-
-        fig.add_trace(
-            go.Scatter(
-                x=temp_df.index,
-                y=y,
-                mode="markers+text",
-                text=temp_df["text"],
-                marker_color=temp_df["color"],
-                textfont_family="Oswald",
-                textfont_size=24,
-                marker_size=86,
-            )
+        # La etiqueta se formatea una sola vez y después se repite.
+        etiqueta = f"<b>{item}</b><br>({total:,.0f} registros)"
+        y.append([etiqueta] * len(temp_df))
+
+        # Las posiciones horizontales de los círculos van del 0 al 9.
+        x.append(np.arange(len(temp_df)))
+
+    # Usamos go.Scatter (SVG) en lugar de go.Scattergl a propósito.
+    # WebGL no soporta saltos de línea en los textos y su lienzo
+    # se dibuja encima de cualquier capa de texto SVG.
+    fig.add_trace(
+        go.Scatter(
+            x=np.concatenate(x),
+            y=np.concatenate(y),
+            mode="markers+text",
+            text=np.concatenate(textos),
+            marker_color=np.concatenate(colores),
+            textfont_family="Oswald",
+            textfont_size=24,
+            marker_size=86,
         )
-
-    fig.update_xaxes(
-        range=[-0.75, 9.75],
-        showticklabels=False,
-        ticklen=10,
-        zeroline=False,
-        title_standoff=20,
-        tickcolor="#FFFFFF",
-        linewidth=2,
-        showline=True,
-        mirror=True,
-        showgrid=False,
-        nticks=0,
     )
 
-    fig.update_yaxes(
-        range=[12.75, -0.75],
-        ticks="outside",
-        ticklen=10,
-        zeroline=False,
-        title_standoff=12,
-        tickcolor="#FFFFFF",
-        linewidth=2,
-        showline=True,
-        mirror=True,
-        showgrid=False,
-        nticks=0,
-    )
+    return fig
 
-    fig.update_layout(
-        showlegend=False,
-        width=1280,
-        height=1600,
-        font_family="Montserrat",
-        font_color="white",
-        font_size=18,
-        title_text=f"Las 10 entidades de México con <b>{titulo}</b> incidencia delictiva por tipo de delito durante el {año}<br>(un registro puede tener más de una víctima)",
-        title_x=0.5,
-        title_y=0.975,
-        margin_t=100,
-        margin_l=220,
-        margin_r=40,
-        margin_b=60,
-        title_font_size=26,
-        plot_bgcolor="#100F0F",
-        paper_bgcolor="#0F3D3E",
-        annotations=[
-            dict(
-                x=0.01,
-                xanchor="left",
-                xref="paper",
-                y=-0.05,
-                yanchor="bottom",
-                yref="paper",
-                text=f"Fuente: SESNSP ({FECHA_FUENTE})",
-            ),
-            dict(
-                x=0.55,
-                xanchor="center",
-                xref="paper",
-                y=-0.05,
-                yanchor="bottom",
-                yref="paper",
-                text="Incidencia delictiva ajustada por cada 100k habitantes",
-            ),
-            dict(
-                x=1.01,
-                xanchor="right",
-                xref="paper",
-                y=-0.05,
-                yanchor="bottom",
-                yref="paper",
-                text="🧁 @lapanquecita",
-            ),
-        ],
-    )
+
+def main(tipo, año):
+    """
+    Crea y exporta una gráfica con el top 10 o bottom 10
+    de incidencia deliactiva por entidad.
+
+    Parameters
+    ----------
+    tipo : str
+        El tipo de orden, pueden ser 'top' o 'bottom'.
+
+    año : int
+        El año que nos interesa graficar.
+
+    """
+
+    fig = crear_figura(tipo, año)
 
     # El nombre del archivo depende del tipo de orden.
-    fig.write_image(f"./{tipo}_10.png")
+    guardar_imagen(fig, f"./{tipo}_10.png")
+
+    # Las figuras de plotly contienen referencias circulares, por lo que
+    # no se liberan al salir de la función. Las recolectamos de inmediato
+    # para no acumular memoria cuando se crean varias gráficas.
+    del fig
+    gc.collect()
 
 
-def formatear_texto(x):
+def formatear_texto(tasas, abreviaciones):
     """
     Las tasas pueden variar desde 0 a más de 100.
     Para mantener la estétitica, nos aseguramos de
     que siempre tengan 3 dígitos.
+
+    Parameters
+    ----------
+    tasas : np.ndarray
+        Las tasas de cada entidad.
+
+    abreviaciones : np.ndarray
+        Las abreviaciones de cada entidad.
+
     """
 
-    abreviacion = ABREVIACIONES[x["Clave_Ent"]]
+    # Escogemos el número de decimales según el rango de cada tasa.
+    textos = np.select(
+        [tasas < 10, tasas >= 100],
+        [
+            [f"{tasa:,.2f}" for tasa in tasas],
+            [f"{tasa:,.0f}" for tasa in tasas],
+        ],
+        [f"{tasa:,.1f}" for tasa in tasas],
+    )
 
-    if x["tasa"] < 10:
-        return f"{x['tasa']:,.2f}<br>{abreviacion}"
-    elif x["tasa"] >= 100:
-        return f"{x['tasa']:,.0f}<br>{abreviacion}"
-    else:
-        return f"{x['tasa']:,.1f}<br>{abreviacion}"
+    return np.char.add(np.char.add(textos, "<br>"), abreviaciones)
 
 
 if __name__ == "__main__":
-    main("top", 2023)
-    main("bottom", 2023)
+    # Calculamos las tasas una sola vez, ambas figuras las comparten en caché.
+    calcular_tasas(2023)
+
+    # Creamos y exportamos ambas imágenes al mismo tiempo.
+    # Cada figura solo existe mientras se ejecuta su llamada a main().
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(main, ["top", "bottom"], [2023, 2023]))
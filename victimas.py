@@ -9,15 +9,21 @@ casos se suelen juntar varias víctimas en uno solo.
 
 """
 
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from PIL import Image
+import plotly.io as pio
 from plotly.subplots import make_subplots
 
+from constants import MESES
+from imagenes import guardar_imagen
+
 
 # Todas las gráficas de este script
 # van a compartir el mismo esquema de colores.
@@ -27,40 +33,154 @@ PAPER_BGCOLOR = "#2B2B2B"
 # La fecha en la que los datos fueron recopilados.
 FECHA_FUENTE = "marzo 2024"
 
+# El texto de la fuente que va en el pie de todas las gráficas.
+TEXTO_FUENTE = f"Fuente: SESNSP ({FECHA_FUENTE})"
+
+# El formato de las imágenes exportadas. Las imágenes del README son PNG,
+# pero con FORMATO_IMAGEN=svg nos ahorramos el rasterizado de kaleido
+# y obtenemos archivos vectoriales mucho más ligeros.
+# Si se necesita una imagen rasterizada más ligera, FORMATO_IMAGEN=webp
+# genera archivos mucho más pequeños, aunque kaleido tarda un poco más.
+FORMATO = os.getenv("FORMATO_IMAGEN", "png")
+
+# La versión del procesamiento que se guarda en la carpeta 'cache'.
+# Se debe incrementar cada vez que cambie lo que regresan
+# cargar_victimas() o cargar_serie(), así no se leen resultados viejos.
+VERSION_CACHE = 1
 
-MESES = [
-    "Enero",
-    "Febrero",
-    "Marzo",
-    "Abril",
-    "Mayo",
-    "Junio",
-    "Julio",
-    "Agosto",
-    "Septiembre",
-    "Octubre",
-    "Noviembre",
-    "Diciembre",
-]
+# Todas las gráficas se exportan con el mismo proceso de kaleido,
+# el cual se inicia con la primera imagen y se reutiliza en las demás.
+# Nuestras gráficas no usan fórmulas, así que no necesitamos
+# que cargue MathJax al iniciar.
+if pio.kaleido.scope is not None:
+    pio.kaleido.scope.mathjax = None
 
 
-def tendencia(delito):
+def ruta_cache(ruta):
     """
-    Crea una gráfica con la tendencia de la tasa anual
-    de homicidios dolosos a nivel nacional.
+    Regresa la ruta en la carpeta 'cache' donde se guarda
+    el resultado de procesar el CSV especificado.
+
+    El nombre es un hash de la ruta, la fecha de modificación y el tamaño
+    del CSV, así que si el CSV cambia se genera un archivo nuevo.
+    También incluye VERSION_CACHE y la versión de pandas, así un cambio
+    en el procesamiento o en el formato del pickle genera un archivo nuevo.
 
     Parameters
     ----------
-    delito : str
-        El nombre del delito que se desea graficar.
+    ruta : str
+        La ruta del archivo CSV.
+
+    """
+
+    estado = os.stat(ruta)
+    llave = (
+        f"{ruta}|{estado.st_mtime_ns}|{estado.st_size}|{VERSION_CACHE}|{pd.__version__}"
+    )
+    llave = hashlib.blake2b(llave.encode("utf-8"), digest_size=16).hexdigest()
+
+    return f"./cache/{llave}.pkl"
+
+
+def guardar_cache(df, archivo):
+    """
+    Guarda el resultado procesado en la carpeta 'cache'.
+
+    Primero se escribe un archivo temporal y después se renombra,
+    así una ejecución interrumpida no deja un pickle incompleto
+    que se leería en las siguientes ejecuciones.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or pandas.Series
+        El resultado que se desea guardar.
+
+    archivo : str
+        La ruta regresada por ruta_cache().
+
+    """
+
+    os.makedirs("./cache", exist_ok=True)
+
+    temporal = f"{archivo}.{os.getpid()}.tmp"
+    df.to_pickle(temporal)
+    os.replace(temporal, archivo)
+
+
+def anotaciones_pie(y, x_centro, texto_centro):
+    """
+    Crea las tres anotaciones al pie de las gráficas: la fuente,
+    la descripción del eje horizontal y el autor.
+
+    Parameters
+    ----------
+    y : float
+        La posición vertical de las anotaciones.
+
+    x_centro : float
+        La posición horizontal de la anotación central.
+
+    texto_centro : str
+        El texto de la anotación central.
 
     """
 
-    # Cargamos el dataset de la polación total estimada según el CONAPO.
-    pop = pd.read_csv("./assets/poblacion.csv")
+    return [
+        dict(
+            x=0.01,
+            y=y,
+            xref="paper",
+            yref="paper",
+            xanchor="left",
+            yanchor="top",
+            text=TEXTO_FUENTE,
+        ),
+        dict(
+            x=x_centro,
+            y=y,
+            xref="paper",
+            yref="paper",
+            xanchor="center",
+            yanchor="top",
+            text=texto_centro,
+        ),
+        dict(
+            x=1.01,
+            y=y,
+            xref="paper",
+            yref="paper",
+            xanchor="right",
+            yanchor="top",
+            text="🧁 @lapanquecita",
+        ),
+    ]
+
+
+@lru_cache(maxsize=None)
+def cargar_poblacion():
+    """
+    Carga el dataset de la población total estimada según el CONAPO.
+
+    Se usa por más de una función, por lo que lo cargamos una sola vez.
+    El DataFrame es compartido, así que no debe ser modificado.
+
+    """
+
+    return pd.read_csv("./assets/poblacion.csv")
+
+
+@lru_cache(maxsize=None)
+def cargar_poblacion_nacional():
+    """
+    Calcula la población nacional de cada año, indexada por el año como entero.
+
+    El cálculo se hace una sola vez y se reutiliza en cada llamada.
+    La Serie es compartida, así que no debe ser modificada.
+
+    """
 
     # Seleccionamos las columnas ed años.
-    pop = pop.iloc[:, 3:]
+    pop = cargar_poblacion().iloc[:, 3:]
 
     # Calculamos la población nacional anual.
     pop = pop.sum(axis=0)
@@ -68,22 +188,176 @@ def tendencia(delito):
     # Convertimos el índice a int.
     pop.index = pop.index.astype(int)
 
-    # Cargamos el dataset de víctimas (serie de tiempo).
+    return pop
+
+
+@lru_cache(maxsize=None)
+def cargar_poblacion_estatal():
+    """
+    Calcula la población de cada entidad, con una columna por año.
+
+    El cálculo se hace una sola vez y se reutiliza en cada llamada.
+    El DataFrame es compartido, así que no debe ser modificado.
+
+    """
+
+    return cargar_poblacion().groupby("Entidad").sum(numeric_only=True)
+
+
+@lru_cache(maxsize=None)
+def cargar_victimas():
+    """
+    Carga el dataset de víctimas con codificación latin-1 y lo
+    agrega en totales anuales por delito, año, entidad y sexo.
+
+    Se usa por más de una función, por lo que lo cargamos una sola vez.
+    La Serie es compartida, así que no debe ser modificada.
+
+    Las columnas de texto con pocos valores distintos se leen como
+    categorías, así los filtros comparan códigos enteros en lugar de
+    cadenas de texto y el DataFrame ocupa mucha menos memoria.
+
+    Los meses solo se usan para obtener el total anual, así que lo
+    calculamos aquí una sola vez y descartamos sus columnas.
+
+    El resultado tiene un índice ordenado, así cada función selecciona
+    su delito y año con .loc en lugar de volver a filtrar y agrupar
+    todo el dataset.
+
+    El resultado se guarda en la carpeta 'cache', así las siguientes
+    ejecuciones no vuelven a leer el CSV.
+
+    """
+
+    # Si ya procesamos este CSV, leemos el resultado de la caché.
+    archivo = ruta_cache("./data/victimas.csv")
+
+    if os.path.exists(archivo):
+        return pd.read_pickle(archivo)
+
     df = pd.read_csv(
-        "./data/timeseries_victimas.csv", parse_dates=["isodate"], index_col=0
+        "./data/victimas.csv",
+        encoding="latin-1",
+        usecols=["Año", "Entidad", "Subtipo de delito", "Sexo", *MESES],
+        dtype={
+            "Año": "int16",
+            "Entidad": "category",
+            "Subtipo de delito": "category",
+            "Sexo": "category",
+        },
     )
 
-    # Seleccionamos los registros a nivel nacional.
-    df = df[df["entidad"] == "Nacional"]
+    # Calculamos el total anual al sumar todos los meses.
+    # Sumamos directamente sobre la matriz de NumPy, ignorando
+    # los meses que aún no tienen registros (NaN).
+    df["Total"] = np.nansum(df[list(MESES)].to_numpy(dtype=float), axis=1)
+
+    # Sumamos los totales de cada combinación de delito, año, entidad y sexo.
+    df = (
+        df.groupby(["Subtipo de delito", "Año", "Entidad", "Sexo"], observed=True)[
+            "Total"
+        ]
+        .sum()
+        .sort_index()
+    )
 
-    # Filtramos por el delito que nos interesa.
-    df = df[df["delito"] == delito]
+    # Guardamos el resultado para las siguientes ejecuciones.
+    guardar_cache(df, archivo)
+
+    return df
+
+
+@lru_cache(maxsize=None)
+def cargar_serie():
+    """
+    Carga el dataset de víctimas (serie de tiempo), indexado
+    por delito, entidad y fecha.
+
+    Se usa por más de una función, por lo que lo cargamos una sola vez.
+    El DataFrame es compartido, así que no debe ser modificado.
+
+    Las entidades y los delitos se leen como categorías.
+
+    El índice se ordena una sola vez, así cada función puede seleccionar
+    un delito y una entidad con .loc en lugar de recorrer todo el dataset.
+
+    El resultado se guarda en la carpeta 'cache', así las siguientes
+    ejecuciones no vuelven a leer el CSV.
+
+    """
+
+    # Si ya procesamos este CSV, leemos el resultado de la caché.
+    archivo = ruta_cache("./data/timeseries_victimas.csv")
+
+    if os.path.exists(archivo):
+        return pd.read_pickle(archivo)
+
+    df = pd.read_csv(
+        "./data/timeseries_victimas.csv",
+        parse_dates=["isodate"],
+        dtype={"entidad": "category", "delito": "category"},
+    )
+
+    df = df.set_index(["delito", "entidad", "isodate"]).sort_index()
+
+    # Guardamos el resultado para las siguientes ejecuciones.
+    guardar_cache(df, archivo)
+
+    return df
+
+
+@lru_cache(maxsize=None)
+def cargar_geojson():
+    """
+    Carga el GeoJSON de México.
+
+    Lo cargamos una sola vez para no volver a leerlo en cada mapa.
+    El diccionario es compartido, así que no debe ser modificado.
+
+    """
+
+    with open("./assets/mexico.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def tendencia(delito, df=None, pop=None):
+    """
+    Crea una gráfica con la tendencia de la tasa anual
+    de homicidios dolosos a nivel nacional.
+
+    Parameters
+    ----------
+    delito : str
+        El nombre del delito que se desea graficar.
+
+    df : pandas.DataFrame, optional
+        El dataset de víctimas (serie de tiempo). Si no se especifica, se carga.
+
+    pop : pandas.Series, optional
+        La población nacional de cada año. Si no se especifica, se calcula.
+
+    """
+
+    # Cargamos los datasets en caso de no haberlos recibido.
+    if df is None:
+        df = cargar_serie()
+
+    if pop is None:
+        pop = cargar_poblacion_nacional()
+
+    # Seleccionamos los registros a nivel nacional del delito que nos interesa.
+    # El índice ya está ordenado, por lo que esta selección no recorre
+    # todo el dataset. El resultado queda indexado por fecha.
+    df = df.loc[(delito, "Nacional")]
 
     # Calculamos el total de víctimas por año.
-    df = df.resample("YE").sum(numeric_only=True)
+    # Agrupamos directamente por el año, ya que es lo único que
+    # necesitamos para emparejar los DataFrames.
+    # La suma la hacemos con bincount sobre los arreglos de NumPy.
+    años, posiciones = np.unique(df.index.year, return_inverse=True)
+    totales = np.bincount(posiciones, weights=df["total"].to_numpy())
 
-    # Solo necesitamos el año para emparejar los DataFrames.
-    df.index = df.index.year
+    df = pd.DataFrame({"total": totales.astype("int64")}, index=años)
 
     # Agregamos la población total para cada año.
     df["poblacion"] = pop
@@ -92,8 +366,13 @@ def tendencia(delito):
     df["tasa"] = df["total"] / df["poblacion"] * 100000
 
     # Preparamos el texto para cada observación dentro de la gráfica.
-    df["texto"] = df.apply(
-        lambda x: f"<b>{x['tasa']:,.2f}</b><br>({x['total']:,.0f})", axis=1
+    # Formateamos columna por columna en lugar de fila por fila.
+    df["texto"] = (
+        "<b>"
+        + df["tasa"].map("{:,.2f}".format)
+        + "</b><br>("
+        + df["total"].map("{:,.0f}".format)
+        + ")"
     )
 
     fig = go.Figure()
@@ -170,41 +449,13 @@ def tendencia(delito):
         title_font_size=22,
         paper_bgcolor=PAPER_BGCOLOR,
         plot_bgcolor=PLOT_BGCOLOR,
-        annotations=[
-            dict(
-                x=0.01,
-                y=-0.13,
-                xref="paper",
-                yref="paper",
-                xanchor="left",
-                yanchor="top",
-                text=f"Fuente: SESNSP ({FECHA_FUENTE})",
-            ),
-            dict(
-                x=0.5,
-                y=-0.13,
-                xref="paper",
-                yref="paper",
-                xanchor="center",
-                yanchor="top",
-                text="Año de registro del delito",
-            ),
-            dict(
-                x=1.01,
-                y=-0.13,
-                xref="paper",
-                yref="paper",
-                xanchor="right",
-                yanchor="top",
-                text="🧁 @lapanquecita",
-            ),
-        ],
+        annotations=anotaciones_pie(-0.13, 0.5, "Año de registro del delito"),
     )
 
-    fig.write_image("./tendencia.png")
+    guardar_imagen(fig, f"./tendencia.{FORMATO}")
 
 
-def comparacion_entidad(primer_año, segundo_año, delito):
+def comparacion_entidad(primer_año, segundo_año, delito, df=None):
     """
     Crea una gráfica de barras donde se comparan
     los totales de dos años.
@@ -220,29 +471,47 @@ def comparacion_entidad(primer_año, segundo_año, delito):
     delito : str
         El nombre del delito que se desea graficar.
 
+    df : pandas.DataFrame, optional
+        El dataset de víctimas (serie de tiempo). Si no se especifica, se carga.
+
     """
 
-    # Cargamos el dataset de víctimas (serie de tiempo).
-    df = pd.read_csv(
-        "./data/timeseries_victimas.csv", parse_dates=["isodate"], index_col=0
-    )
+    # Cargamos el dataset de víctimas (serie de tiempo) en caso de no haberlo recibido.
+    if df is None:
+        df = cargar_serie()
 
-    # Filtramos por el delito que nos interesa.
-    df = df[df["delito"] == delito]
+    # Seleccionamos el delito que nos interesa desde el índice ordenado.
+    # El resultado queda indexado por entidad y fecha.
+    df = df.loc[delito]
 
     # Seleccionamos los dos años que queremos comparar.
-    df = df[(df.index.year == primer_año) | (df.index.year == segundo_año)]
+    # Solo calculamos el año de los registros que ya filtramos
+    # y lo comparamos directamente sobre el arreglo de NumPy.
+    años = df.index.get_level_values("isodate").year.to_numpy()
+    seleccion = np.isin(años, [primer_año, segundo_año])
+    df = df[seleccion]
+    años = años[seleccion]
 
     # Transformamos el DataFrame para tener los conteos por entidad y por año.
-    df = df.pivot_table(index="entidad", columns=df.index.year, aggfunc="sum")["total"]
+    df = df.groupby(["entidad", años], observed=True)["total"].sum().unstack()
+
+    # Las entidades las regresamos a texto, ya que el índice
+    # será renombrado y un índice categórico no lo permite libremente.
+    df.index = df.index.astype(str)
 
     # Calculamos el cambio porcentual.
     df["cambio"] = (df[segundo_año] - df[primer_año]) / df[primer_año] * 100
 
     # Preparamos el texto para cada observación.
-    df["text"] = df.apply(
-        lambda x: f" {x['cambio']:,.2f}% ({x[primer_año]:,.0f} → {x[segundo_año]:,.0f}) ",
-        axis=1,
+    # Formateamos columna por columna en lugar de fila por fila.
+    df["text"] = (
+        " "
+        + df["cambio"].map("{:,.2f}".format)
+        + "% ("
+        + df[primer_año].map("{:,.0f}".format)
+        + " → "
+        + df[segundo_año].map("{:,.0f}".format)
+        + ") "
     )
 
     # Ordenamos de mayor a menor usando el cambio porcentual.
@@ -264,16 +533,9 @@ def comparacion_entidad(primer_año, segundo_año, delito):
     valor_max = ((valor_max // 5) + 1) * 5
 
     # Determinamos la posición de los textos para cada barra.
-    text_position = list()
-
-    for valor in df["cambio"]:
-        ratio = abs(valor) / valor_max
-
-        # Si el valor está cercano al máximo, la etiqueta irá adentro de la barra.
-        if ratio >= 0.7:
-            text_position.append("inside")
-        else:
-            text_position.append("outside")
+    # Si el valor está cercano al máximo, la etiqueta irá adentro de la barra.
+    ratios = np.abs(df["cambio"].to_numpy()) / valor_max
+    text_position = np.where(ratios >= 0.7, "inside", "outside").tolist()
 
     fig = go.Figure()
 
@@ -339,41 +601,13 @@ def comparacion_entidad(primer_año, segundo_año, delito):
         title_font_size=22,
         paper_bgcolor=PAPER_BGCOLOR,
         plot_bgcolor=PLOT_BGCOLOR,
-        annotations=[
-            dict(
-                x=0.01,
-                y=-0.065,
-                xref="paper",
-                yref="paper",
-                xanchor="left",
-                yanchor="top",
-                text=f"Fuente: SESNSP ({FECHA_FUENTE})",
-            ),
-            dict(
-                x=0.58,
-                y=-0.065,
-                xref="paper",
-                yref="paper",
-                xanchor="center",
-                yanchor="top",
-                text="Cambio porcentual",
-            ),
-            dict(
-                x=1.01,
-                y=-0.065,
-                xref="paper",
-                yref="paper",
-                xanchor="right",
-                yanchor="top",
-                text="🧁 @lapanquecita",
-            ),
-        ],
+        annotations=anotaciones_pie(-0.065, 0.58, "Cambio porcentual"),
     )
 
-    fig.write_image("./comparacion_entidad.png")
+    guardar_imagen(fig, f"./comparacion_entidad.{FORMATO}")
 
 
-def crear_mapa(año, delito):
+def crear_mapa(año, delito, df=None, pop=None):
     """
     Crea un mapa Choropleth y una tabla con las tasas y total
     de víctimas en México por entidad de registro del
@@ -387,36 +621,42 @@ def crear_mapa(año, delito):
     delito : str
         El nombre del delito que se desea graficar.
 
+    df : pandas.Series, optional
+        Los totales de víctimas como los regresa cargar_victimas().
+        Si no se especifica, se carga.
+
+    pop : pandas.DataFrame, optional
+        La población de cada entidad por año. Si no se especifica, se calcula.
+
     """
 
-    # Cargamos el dataset de la polación total estimada según el CONAPO.
-    pop = pd.read_csv("./assets/poblacion.csv")
+    # Cargamos los datasets en caso de no haberlos recibido.
+    if df is None:
+        df = cargar_victimas()
 
-    # Calculamos la población total por entidad.
-    pop = pop.groupby("Entidad").sum(numeric_only=True)
+    if pop is None:
+        pop = cargar_poblacion_estatal()
 
     # Seleccionamos la población del año de nuestro interés.
     pop = pop[str(año)]
 
-    # Cargamos el dataset de víctimas.
-    df = pd.read_csv("./data/victimas.csv", encoding="latin-1")
-
-    # Filtramos por el delito que nos interesa.
-    df = df[df["Subtipo de delito"] == delito]
-
-    # Seleccionamos los registros del año de nuestro interés.
-    df = df[df["Año"] == año]
-
-    # Calculamos el total anual al sumar todos los meses.
-    df["Total"] = df[MESES].sum(axis=1)
+    # Seleccionamos el delito y el año de nuestro interés.
+    # El resultado queda indexado por entidad y sexo.
+    df = df.loc[(delito, año)]
 
     # Transformamos el DataFrame para que las columnas sean el sexo de la víctima.
-    df = df.pivot_table(
-        index="Entidad", columns="Sexo", values="Total", fill_value=0, aggfunc="sum"
-    )
+    df = df.unstack("Sexo", fill_value=0)
+
+    # Las entidades y el sexo los regresamos a texto,
+    # ya que el resultado recibirá nuevas filas y columnas.
+    df.index = df.index.astype(str)
+    df.columns = df.columns.astype(str)
 
     # Calculamos el total de víctimas por entidad.
-    df["Todos"] = df.sum(axis=1)
+    # En este punto el DataFrame solo tiene las columnas de cada sexo,
+    # así que sumamos directamente sobre su matriz de NumPy.
+    valores = df.to_numpy()
+    df["Todos"] = valores.sum(axis=1)
 
     # Agregamos la población para cada entidad.
     df["poblacion"] = pop
@@ -438,7 +678,8 @@ def crear_mapa(año, delito):
     )
 
     # Calculamos los valores a nivel nacional para configurar el subtítulo.
-    total_nacional = df["Todos"].sum()
+    # El total nacional lo obtenemos de la misma matriz de cada sexo.
+    total_nacional = valores.sum()
     total_poblacion = df["poblacion"].sum()
     tasa_nacional = total_nacional / total_poblacion * 100000
     subtitulo = f"Nacional: {tasa_nacional:,.2f} ({total_nacional:,.0f} registros)"
@@ -451,33 +692,38 @@ def crear_mapa(año, delito):
 
     # Vamos a crear nuestra escala con 11 intervalos.
     marcas = np.linspace(min_value, max_value, 11)
-    etiquetas = list()
-
-    for marca in marcas:
-        etiquetas.append(f"{marca:,.1f}")
+    etiquetas = [f"{marca:,.1f}" for marca in marcas]
 
     # A la última etiqueta le agregamos el símbolo de 'mayor o igual que'.
     etiquetas[-1] = f"≥{etiquetas[-1]}"
 
     # Cargamos el GeoJSON de México.
-    geojson = json.load(open("./assets/mexico.json", "r", encoding="utf-8"))
+    geojson = cargar_geojson()
 
-    # Estas listas serán usadas para configurar el mapa Choropleth.    ubicaciones = list()
-    valores = list()
-    ubicaciones = list()
+    # Estas listas serán usadas para configurar el mapa Choropleth.
+    # Extraemos el nombre de cada entidad dentro del GeoJSON.
+    ubicaciones = [item["properties"]["NOMGEO"] for item in geojson["features"]]
 
-    # Iteramos sobre las entidades dentro del GeoJSON.
-    for item in geojson["features"]:
-        # Extraemos el nombre de la entidad.
-        geo = item["properties"]["NOMGEO"]
+    # Obtenemos la tasa de cada entidad en el mismo orden que el GeoJSON.
+    # Un diccionario es mucho más rápido que llamar df.loc por cada entidad.
+    tasas = df["tasa"].to_dict()
+    valores = [tasas[geo] for geo in ubicaciones]
 
-        # Agregamos el objeto de la entidad y su valor a las listas correspondientes.
-        ubicaciones.append(geo)
-        valores.append(df.loc[geo, "tasa"])
-
-    fig = go.Figure()
+    # El mapa y las tablas van en una sola figura de 1280x1280.
+    # El mapa ocupa la fila superior y las dos tablas la inferior.
+    fig = make_subplots(
+        rows=2,
+        cols=2,
+        row_heights=[640, 540],
+        vertical_spacing=0.04,
+        horizontal_spacing=0.03,
+        specs=[
+            [{"type": "choropleth", "colspan": 2}, None],
+            [{"type": "table"}, {"type": "table"}],
+        ],
+    )
 
-    fig.add_traces(
+    fig.add_trace(
         go.Choropleth(
             geojson=geojson,
             locations=ubicaciones,
@@ -486,7 +732,8 @@ def crear_mapa(año, delito):
             colorscale="portland",
             colorbar=dict(
                 x=0.03,
-                y=0.5,
+                y=0.74,
+                len=0.52,
                 ypad=50,
                 ticks="outside",
                 outlinewidth=2,
@@ -502,7 +749,9 @@ def crear_mapa(año, delito):
             marker_line_width=1.0,
             zmin=min_value,
             zmax=max_value,
-        )
+        ),
+        col=1,
+        row=1,
     )
 
     fig.update_geos(
@@ -517,16 +766,55 @@ def crear_mapa(año, delito):
         landcolor="#1C0A00",
     )
 
+    # Dividimos las entidades en dos tablas de 16 filas cada una.
+    for col, filas in [(1, slice(None, 16)), (2, slice(16, None))]:
+        fig.add_trace(
+            go.Table(
+                columnwidth=[150, 80],
+                header=dict(
+                    values=[
+                        "<b>Entidad</b>",
+                        "<b>Hombres</b>",
+                        "<b>Mujeres</b>",
+                        "<b>Total*</b>",
+                        "<b>Tasa ↓</b>",
+                    ],
+                    font_color="#FFFFFF",
+                    fill_color="#FF1E56",
+                    align="center",
+                    height=27,
+                    line_width=0.8,
+                ),
+                cells=dict(
+                    values=[
+                        df.index[filas],
+                        df["Hombre"][filas],
+                        df["Mujer"][filas],
+                        df["Todos"][filas],
+                        df["tasa"][filas],
+                    ],
+                    fill_color=PLOT_BGCOLOR,
+                    height=27,
+                    format=["", ",", ",", ",", ",.2f"],
+                    line_width=0.8,
+                    align=["left", "center"],
+                ),
+            ),
+            col=col,
+            row=2,
+        )
+
     fig.update_layout(
         showlegend=False,
+        width=1280,
+        height=1280,
         font_family="Montserrat",
         font_color="#FFFFFF",
+        font_size=17,
         margin_t=50,
         margin_r=40,
-        margin_b=30,
+        margin_b=0,
         margin_l=40,
-        width=1280,
-        height=720,
         paper_bgcolor=PAPER_BGCOLOR,
         annotations=[
             dict(
@@ -539,7 +827,7 @@ def crear_mapa(año, delito):
             ),
             dict(
                 x=0.0275,
-                y=0.45,
+                y=0.714,
                 textangle=-90,
                 xanchor="center",
                 yanchor="middle",
@@ -548,7 +836,7 @@ def crear_mapa(año, delito):
             ),
             dict(
                 x=0.58,
-                y=-0.04,
+                y=0.459,
                 xanchor="center",
                 yanchor="top",
                 text=subtitulo,
@@ -556,119 +844,23 @@ def crear_mapa(año, delito):
             ),
             dict(
                 x=0.01,
-                y=-0.04,
+                y=0.459,
                 xanchor="left",
                 yanchor="top",
-                text=f"Fuente: SESNSP ({FECHA_FUENTE})",
+                text=TEXTO_FUENTE,
                 font_size=22,
             ),
             dict(
                 x=1.01,
-                y=-0.04,
+                y=0.459,
                 xanchor="right",
                 yanchor="top",
                 text="🧁 @lapanquecita",
                 font_size=22,
             ),
-        ],
-    )
-
-    fig.write_image("./1.png")
-
-    fig = make_subplots(
-        rows=1,
-        cols=2,
-        horizontal_spacing=0.03,
-        specs=[[{"type": "table"}, {"type": "table"}]],
-    )
-
-    fig.add_trace(
-        go.Table(
-            columnwidth=[150, 80],
-            header=dict(
-                values=[
-                    "<b>Entidad</b>",
-                    "<b>Hombres</b>",
-                    "<b>Mujeres</b>",
-                    "<b>Total*</b>",
-                    "<b>Tasa ↓</b>",
-                ],
-                font_color="#FFFFFF",
-                fill_color="#FF1E56",
-                align="center",
-                height=27,
-                line_width=0.8,
-            ),
-            cells=dict(
-                values=[
-                    df.index[:16],
-                    df["Hombre"][:16],
-                    df["Mujer"][:16],
-                    df["Todos"][:16],
-                    df["tasa"][:16],
-                ],
-                fill_color=PLOT_BGCOLOR,
-                height=27,
-                format=["", ",", ",", ",", ",.2f"],
-                line_width=0.8,
-                align=["left", "center"],
-            ),
-        ),
-        col=1,
-        row=1,
-    )
-
-    fig.add_trace(
-        go.Table(
-            columnwidth=[150, 80],
-            header=dict(
-                values=[
-                    "<b>Entidad</b>",
-                    "<b>Hombres</b>",
-                    "<b>Mujeres</b>",
-                    "<b>Total*</b>",
-                    "<b>Tasa ↓</b>",
-                ],
-                font_color="#FFFFFF",
-                fill_color="#FF1E56",
-                align="center",
-                height=27,
-                line_width=0.8,
-            ),
-            cells=dict(
-                values=[
-                    df.index[16:],
-                    df["Hombre"][16:],
-                    df["Mujer"][16:],
-                    df["Todos"][16:],
-                    df["tasa"][16:],
-                ],
-                fill_color=PLOT_BGCOLOR,
-                height=27,
-                format=["", ",", ",", ",", ",.2f"],
-                line_width=0.8,
-                align=["left", "center"],
-            ),
-        ),
-        col=2,
-        row=1,
-    )
-
-    fig.update_layout(
-        width=1280,
-        height=560,
-        font_family="Montserrat",
-        font_color="#FFFFFF",
-        font_size=17,
-        margin_t=20,
-        margin_l=40,
-        margin_r=40,
-        margin_b=0,
-        paper_bgcolor=PAPER_BGCOLOR,
-        annotations=[
             dict(
                 x=0.5,
-                y=0.025,
+                y=0.011,
                 xanchor="center",
                 yanchor="top",
                 text="*El total está conformado por víctimas hombres, mujeres y de sexo no identificado.",
@@ -676,30 +868,10 @@ def crear_mapa(año, delito):
         ],
     )
 
-    fig.write_image("./2.png")
-
-    # Vamos a usar la librería Pillow para unir ambas imágenes.
-    # Primero cargamos las dos imágenes recién creadas.
-    imagen1 = Image.open("./1.png")
-    imagen2 = Image.open("./2.png")
+    guardar_imagen(fig, f"./estatal_{año}.{FORMATO}")
 
-    # Calculamos el ancho y alto final de nuestra imagen.
-    resultado_ancho = imagen1.width
-    resultado_alto = imagen1.height + imagen2.height
 
-    # Copiamos los pixeles de ambas imágenes.
-    resultado = Image.new("RGB", (resultado_ancho, resultado_alto))
-    resultado.paste(im=imagen1, box=(0, 0))
-    resultado.paste(im=imagen2, box=(0, imagen1.height))
-
-    # Exportamos la nueva imagen unida y borramos las originales.
-    resultado.save(f"./estatal_{año}.png")
-
-    os.remove("./1.png")
-    os.remove("./2.png")
-
-
-def plot_sexo(año, delito):
+def plot_sexo(año, delito, df=None):
     """
     Crea una gráfica de barras normalizada con la
     distribución del delito por sexo de la víctima.
@@ -712,29 +884,28 @@ def plot_sexo(año, delito):
     delito : str
         El nombre del delito que se desea graficar.
 
-    """
+    df : pandas.Series, optional
+        Los totales de víctimas como los regresa cargar_victimas().
+        Si no se especifica, se carga.
 
-    # Cargamos el dataset de víctimas.
-    df = pd.read_csv("./data/victimas.csv", encoding="latin-1")
-
-    # Filtramos por el delito que nos interesa.
-    df = df[df["Subtipo de delito"] == delito]
+    """
 
-    # Seleccionamos los registros del año de nuestro interés.
-    df = df[df["Año"] == año]
+    # Cargamos el dataset de víctimas en caso de no haberlo recibido.
+    if df is None:
+        df = cargar_victimas()
 
-    # CAlculamos el total anual.
-    df["Total"] = df[MESES].sum(axis=1)
+    # Seleccionamos el delito y el año de nuestro interés.
+    # El resultado queda indexado por entidad y sexo.
+    df = df.loc[(delito, año)]
 
     # Transformamos el DataFrame para que
     # el índice sean las entidades y el sexo las columnas.
-    df = df.pivot_table(
-        index="Entidad",
-        columns="Sexo",
-        values="Total",
-        aggfunc="sum",
-        fill_value=0,
-    )
+    df = df.unstack("Sexo", fill_value=0)
+
+    # Las entidades y el sexo los regresamos a texto,
+    # ya que el resultado recibirá nuevas filas y columnas.
+    df.index = df.index.astype(str)
+    df.columns = df.columns.astype(str)
 
     # Renombramos algunos estados a sus nombres comunes.
     df = df.rename(
@@ -748,84 +919,67 @@ def plot_sexo(año, delito):
 
     # Calculamos de nuevo el total, esto será usado
     # para calcular los porcentajes.
-    df["Total"] = df.sum(axis=1)
+    # Ambas sumas se hacen sobre la misma matriz de NumPy
+    # con las columnas de cada sexo.
+    valores = df[["Hombre", "Mujer", "No identificado"]].to_numpy()
+    df["Total"] = valores.sum(axis=1)
 
     # Agregamos la fila para los datos a nivel nacional.
-    df.loc["<b>Nacional</b>"] = df.sum(axis=0)
+    # Su total es la suma de los totales de cada sexo.
+    nacional = valores.sum(axis=0)
+    df.loc["<b>Nacional</b>"] = np.append(nacional, nacional.sum())
 
-    # Calculamos los porcentajes para cada sexo.
-    df["perc_hombre"] = df["Hombre"] / df["Total"] * 100
-    df["perc_mujer"] = df["Mujer"] / df["Total"] * 100
-    df["perc_no_identificado"] = df["No identificado"] / df["Total"] * 100
-
-    # Creamos los textos para cada entidad.
-    df["text_hombre"] = df.apply(
-        lambda x: format_text(x["perc_hombre"], x["Hombre"]),
-        axis=1,
-    )
-
-    df["text_mujer"] = df.apply(
-        lambda x: format_text(x["perc_mujer"], x["Mujer"]),
-        axis=1,
-    )
-
-    df["text_no_identificado"] = df.apply(
-        lambda x: format_text(x["perc_no_identificado"], x["No identificado"]),
-        axis=1,
-    )
+    # Calculamos los porcentajes de todos los sexos en una sola matriz,
+    # donde cada columna corresponde a un sexo.
+    # Volvemos a tomar los conteos para incluir la fila nacional.
+    valores = df[["Hombre", "Mujer", "No identificado"]].to_numpy()
+    porcentajes = valores / df["Total"].to_numpy()[:, None] * 100
 
     # Ordenamos de mayor a menor proporción de hombres violentados.
-    df.sort_values(["perc_hombre", "perc_mujer"], ascending=False, inplace=True)
+    # En caso de empate, usamos la proporción de mujeres.
+    orden = np.lexsort((-porcentajes[:, 1], -porcentajes[:, 0]))
+
+    entidades = df.index[orden]
+    valores = valores[orden]
+    porcentajes = porcentajes[orden]
 
     # Para crear una gráfica de barras normalizada solo
     # necesitamos que los valores sumen 100.
     # En este caso son 3 gráficas de barrs horizontales apiladas.
     fig = go.Figure()
 
-    fig.add_trace(
-        go.Bar(
-            y=df.index,
-            x=df["perc_hombre"],
-            text=df["text_hombre"],
-            name="Hombre",
-            textposition="inside",
-            orientation="h",
-            marker_color="#3366CC",
-            marker_line_width=0,
-            textfont_family="Oswald",
-            textfont_size=40,
-        )
-    )
-
-    fig.add_trace(
-        go.Bar(
-            y=df.index,
-            x=df["perc_mujer"],
-            text=df["text_mujer"],
-            name="Mujer",
-            textposition="inside",
-            orientation="h",
-            marker_color="#d81b60",
-            marker_line_width=0,
-            textfont_family="Oswald",
-            textfont_size=40,
-        )
-    )
-
-    fig.add_trace(
-        go.Bar(
-            y=df.index,
-            x=df["perc_no_identificado"],
-            text=df["text_no_identificado"],
-            name="No identificado",
-            textposition="inside",
-            orientation="h",
-            marker_color="#7b1fa2",
-            marker_line_width=0,
-            textfont_family="Oswald",
-            textfont_size=40,
+    for indice, (sexo, color) in enumerate(
+        [
+            ("Hombre", "#3366CC"),
+            ("Mujer", "#d81b60"),
+            ("No identificado", "#7b1fa2"),
+        ]
+    ):
+        # Creamos los textos para cada entidad.
+        # Si el porcentaje es 100, no redondeamos.
+        textos = [
+            (
+                f" {perc:,.0f}% ({conteo:,.0f}) "
+                if perc == 100
+                else f" {perc:,.1f}% ({conteo:,.0f}) "
+            )
+            for perc, conteo in zip(porcentajes[:, indice], valores[:, indice])
+        ]
+
+        fig.add_trace(
+            go.Bar(
+                y=entidades,
+                x=porcentajes[:, indice],
+                text=textos,
+                name=sexo,
+                textposition="inside",
+                orientation="h",
+                marker_color=color,
+                marker_line_width=0,
+                textfont_family="Oswald",
+                textfont_size=40,
+            )
         )
-    )
 
     # Nos aseguramos que el rango sea de 0 a 100.
     fig.update_xaxes(
@@ -882,55 +1036,34 @@ def plot_sexo(año, delito):
         title_font_size=22,
         paper_bgcolor=PAPER_BGCOLOR,
         plot_bgcolor=PLOT_BGCOLOR,
-        annotations=[
-            dict(
-                x=0.01,
-                y=-0.07,
-                xref="paper",
-                yref="paper",
-                xanchor="left",
-                yanchor="top",
-                text=f"Fuente: SESNSP ({FECHA_FUENTE})",
-            ),
-            dict(
-                x=0.57,
-                y=-0.07,
-                xref="paper",
-                yref="paper",
-                xanchor="center",
-                yanchor="top",
-                text="Proporción dentro de cada categoría (absolutos)",
-            ),
-            dict(
-                x=1.01,
-                y=-0.07,
-                xref="paper",
-                yref="paper",
-                xanchor="right",
-                yanchor="top",
-                text="🧁 @lapanquecita",
-            ),
-        ],
+        annotations=anotaciones_pie(
+            -0.07, 0.57, "Proporción dentro de cada categoría (absolutos)"
+        ),
     )
 
-    fig.write_image(f"./comparacion_sexo_{año}.png")
-
-
-def format_text(perc, total):
-    """
-    Da formato a los textos de cada barra en
-    la gráfiac de barras normalizada.
-    """
-
-    # Si el porcentaje es 100, no redondeamos.
-    if perc == 100:
-        return f" {perc:,.0f}% ({total:,.0f}) "
-    else:
-        return f" {perc:,.1f}% ({total:,.0f}) "
+    guardar_imagen(fig, f"./comparacion_sexo_{año}.{FORMATO}")
 
 
 if __name__ == "__main__":
-    tendencia("Extorsión")
-    comparacion_entidad(2022, 2023, "Extorsión")
-    crear_mapa(2023, "Extorsión")
-    plot_sexo(2023, "Extorsión")
+    # Cargamos cada dataset una sola vez y lo compartimos entre las gráficas.
+    serie = cargar_serie()
+    victimas = cargar_victimas()
+    poblacion_nacional = cargar_poblacion_nacional()
+    poblacion_estatal = cargar_poblacion_estatal()
+
+    # Cada gráfica es independiente, así que las creamos en paralelo.
+    # Usamos procesos, ya que cada uno exporta con su propio kaleido.
+    # Por defecto se usa un proceso por cada núcleo disponible.
+    # Las enviamos de la más tardada a la más rápida, así el mapa
+    # no se queda al final mientras los demás procesos esperan.
+    with ProcessPoolExecutor() as executor:
+        tareas = [
+            executor.submit(crear_mapa, 2023, "Extorsión", victimas, poblacion_estatal),
+            executor.submit(plot_sexo, 2023, "Extorsión", victimas),
+            executor.submit(tendencia, "Extorsión", serie, poblacion_nacional),
+            executor.submit(comparacion_entidad, 2022, 2023, "Extorsión", serie),
+        ]
+
+    # Mostramos cualquier error ocurrido dentro de los procesos.
+    for tarea in tareas:
+        tarea.result()